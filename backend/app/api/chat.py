@@ -1,8 +1,14 @@
+import json
+import math
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 
+from app.core.config import settings
 from app.core.security import verify_api_key
 from app.core.rate_limiter import rate_limiter
-from app.models.schemas import ChatRequest, ChatResponse
+from app.models.schemas import BatchChatRequest, ChatRequest, ChatResponse
+from app.services.answer_cache import answer_cache
 from app.services.rag_service import RAGService
 
 router = APIRouter(prefix="/api/v1", tags=["chat"])
@@ -16,12 +22,12 @@ rag_service = RAGService()
     status_code=status.HTTP_200_OK
 )
 @rate_limiter
-def chat(
+async def chat(
     request: ChatRequest,
     api_key: str = Depends(verify_api_key)
 ):
     try:
-        return rag_service.run(request.question, request.workspace_id)
+        return await rag_service.arun(request.question, request.workspace_id, request.session_id)
     except Exception as e:
         import traceback
         tb = traceback.format_exc()
@@ -31,3 +37,98 @@ def chat(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Chat failed: {str(e)} | Trace: {tb[-200:]}"
         )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post(
+    "/chat/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse
+)
+@rate_limiter
+async def chat_stream(
+    request: ChatRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Server-sent events version of /chat.
+
+    Events: `citations` (after retrieval), `token` (answer fragments) and a
+    final `done` (with the `session_id`, as in /chat). When `done` has `refused: true` the answer is the refusal
+    string and previously sent citations must be dropped. Failures after the
+    stream has started are reported as an `error` event.
+    """
+    events = rag_service.stream(request.question, request.workspace_id, request.session_id)
+
+    async def event_source():
+        try:
+            async for event, data in events:
+                yield _sse(event, data)
+        except Exception as e:
+            import traceback
+            print(f"Chat Stream Error: {traceback.format_exc()}")
+            yield _sse("error", {"detail": f"Chat failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _batch_cost(kwargs: dict) -> int:
+    # A batch of N questions counts as ceil(N / RATE_LIMIT_BATCH_QUESTIONS) requests
+    per_request = max(1, settings.RATE_LIMIT_BATCH_QUESTIONS)
+    return math.ceil(len(kwargs["request"].questions) / per_request)
+
+
+@router.post(
+    "/chat/batch",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse
+)
+@rate_limiter(cost=_batch_cost)
+async def chat_batch(
+    request: BatchChatRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Answer a list of questions (e.g. a vendor questionnaire) against one workspace.
+
+    Server-sent events, in completion order: one `result` per question with
+    its `index` in the request plus `answer` and `citations` (as in /chat),
+    an `error` event with `index` for a question that failed, and a final
+    `done` with the number of questions.
+    """
+    results = rag_service.stream_batch(request.questions, request.workspace_id)
+
+    async def event_source():
+        try:
+            async for index, response in results:
+                if "error" in response:
+                    yield _sse("error", {"index": index, "detail": response["error"]})
+                else:
+                    yield _sse("result", {"index": index, "question": request.questions[index], **response})
+            yield _sse("done", {"count": len(request.questions)})
+        except Exception as e:
+            import traceback
+            print(f"Batch Chat Error: {traceback.format_exc()}")
+            yield _sse("error", {"detail": f"Chat failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/chat/cache")
+def answer_cache_stats(api_key: str = Depends(verify_api_key)):
+    """
+    Semantic answer cache metrics: size, hits, misses, hit rate and the
+    retrieval + generation time saved by hits.
+    """
+    return answer_cache.stats()
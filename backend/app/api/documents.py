@@ -1,23 +1,62 @@
-from fastapi import APIRouter, UploadFile, File, Depends
-from typing import List
-from app.models.document import DocumentMetadata
-from app.services.document_service import document_service
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Request, status
+from fastapi.routing import APIRoute
+from typing import Callable, List
+from app.models.document import DocumentMetadata, IngestionJob
+from app.services.document_service import document_service, upload_too_large
+from app.core.config import settings
 from app.core.security import verify_api_key
 
+# Boundaries and part headers around the file in a multipart body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    Enforces UPLOAD_MAX_BYTES on the raw request body, before FastAPI parses
+    the multipart form (which spools the whole file): a larger declared
+    Content-Length is rejected (413) without reading the body, and a body
+    sent without one is cut off as soon as it passes the limit.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request):
+            limit = settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+            length = request.headers.get("content-length", "")
+            if length.isdigit() and int(length) > limit:
+                raise upload_too_large()
+
+            received = 0
+
+            async def receive():
+                nonlocal received
+                message = await request.receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise upload_too_large()
+                return message
+
+            return await handler(Request(request.scope, receive))
+
+        return limited_handler
+
+
 router = APIRouter(
     prefix="/documents",
     tags=["Documents"],
-    dependencies=[Depends(verify_api_key)]
+    dependencies=[Depends(verify_api_key)],
+    route_class=UploadLimitRoute
 )
 
-@router.post("/upload", response_model=DocumentMetadata)
+@router.post("/upload", response_model=DocumentMetadata, status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(file: UploadFile = File(...)):
     """
     Upload a PDF document.
     - Validates file type
-    - Saves to disk
-    - Ingests into STAGING vector store
-    - Returns document metadata
+    - Saves it and queues background ingestion into the vector store
+    - Returns document metadata right away (status="processing", job_id)
     """
     return await document_service.upload_document(file)
 
@@ -27,3 +66,24 @@ def list_documents():
     List all available documents in the system.
     """
     return document_service.list_documents()
+
+@router.get("/jobs/{job_id}", response_model=IngestionJob)
+def get_ingestion_job(job_id: str):
+    """
+    Ingestion progress for an upload: pages extracted, chunks embedded,
+    chunks upserted, and the final status ("available" or "error").
+    """
+    job = document_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{document_id}", response_model=DocumentMetadata)
+def get_document(document_id: str):
+    """
+    Metadata (including ingestion status) for a single document.
+    """
+    document = document_service.get_document(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return document
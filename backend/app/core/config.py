@@ -1,5 +1,7 @@
 # backend/app/core/config.py
 
+import os
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -18,6 +20,142 @@ class Settings(BaseSettings):
     PINECONE_INDEX_NAME: str = "compliance-policy"
     HUGGINGFACEHUB_API_TOKEN: str = ""
 
+    # Vector store backend: "pinecone" (managed, remote) or "local" (in-process NumPy index).
+    # The local index persists to memory-mapped files under LOCAL_INDEX_DIR.
+    VECTOR_STORE_BACKEND: str = "pinecone"
+    LOCAL_INDEX_DIR: str = "/tmp/vector_index"
+
+    # Query embedding cache (LRU + TTL). Set the path to spill entries to SQLite
+    # so they survive restarts; leave it empty for a memory-only cache.
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 24 * 3600
+    QUERY_EMBEDDING_CACHE_PATH: str = ""
+
+    # Concurrent (async) query embeddings arriving within QUERY_EMBED_BATCH_WINDOW_MS
+    # of each other are sent as one request of up to QUERY_EMBED_MAX_BATCH_SIZE
+    # questions. 0 sends every query on its own.
+    QUERY_EMBED_BATCH_WINDOW_MS: float = 5.0
+    QUERY_EMBED_MAX_BATCH_SIZE: int = 32
+
+    # Ingestion embedding: chunks are embedded in batches of EMBED_BATCH_SIZE,
+    # with up to EMBED_MAX_CONCURRENCY batches in flight. A failed batch is
+    # retried on its own, up to EMBED_MAX_RETRIES times after the first attempt,
+    # with exponential backoff starting at EMBED_RETRY_BACKOFF_SECONDS.
+    EMBED_BATCH_SIZE: int = 32
+    EMBED_MAX_CONCURRENCY: int = 4
+    EMBED_MAX_RETRIES: int = 3
+    EMBED_RETRY_BACKOFF_SECONDS: float = 1.0
+
+    # Vector-store writes: up to UPSERT_MAX_CONCURRENCY embedded batches are
+    # upserted at once. Pinecone requests are split to at most UPSERT_MAX_VECTORS
+    # vectors and ~UPSERT_MAX_REQUEST_BYTES (the API limit is 2 MB), and one
+    # shared client keeps PINECONE_POOL_THREADS pooled connections.
+    UPSERT_MAX_CONCURRENCY: int = 4
+    UPSERT_MAX_VECTORS: int = 100
+    UPSERT_MAX_REQUEST_BYTES: int = 1_500_000
+    PINECONE_POOL_THREADS: int = 8
+
+    # Workspaces are scoped by stable document ID ({"doc_id": {"$in": [...]}}).
+    # On Pinecone, scopes of more than PINECONE_FILTER_MAX_IDS documents are
+    # queried as several concurrent requests of at most that many IDs each.
+    PINECONE_FILTER_MAX_IDS: int = 1000
+
+    # Uploads are streamed to a temp file in UPLOAD_CHUNK_BYTES pieces and
+    # rejected (413) beyond UPLOAD_MAX_BYTES, checked against Content-Length
+    # and the request stream before the form is parsed.
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+
+    # PDF extraction: pages are extracted in ranges of PDF_EXTRACT_PAGES_PER_TASK
+    # across PDF_EXTRACT_WORKERS processes (<= 1 extracts in-process).
+    # Chunks are indexed in groups of INGEST_FLUSH_CHUNKS while extraction continues.
+    PDF_EXTRACT_WORKERS: int = min(4, os.cpu_count() or 1)
+    PDF_EXTRACT_PAGES_PER_TASK: int = 8
+    INGEST_FLUSH_CHUNKS: int = 256
+
+    # Background ingestion: INGEST_WORKERS uploads are processed at once and up to
+    # INGEST_MAX_PENDING more may wait; the last INGEST_JOB_HISTORY finished jobs stay pollable.
+    INGEST_WORKERS: int = 2
+    INGEST_MAX_PENDING: int = 16
+    INGEST_JOB_HISTORY: int = 200
+
+    # Content-hash registry of indexed documents and chunks (SQLite), used to skip
+    # re-embedding unchanged content. Empty keeps it in memory only.
+    CHUNK_REGISTRY_PATH: str = "/tmp/chunk_registry.sqlite3"
+
+    # Chunk text (SQLite, keyed by chunk_id). The vector index stores only IDs and
+    # filter/citation metadata; retrieved chunks are hydrated from here.
+    # Empty keeps it in memory only.
+    CHUNK_STORE_PATH: str = "/tmp/chunk_store.sqlite3"
+
+    # Hybrid retrieval: BM25 keyword matches (exact clause references such as
+    # "Article 17") are fused with vector results by reciprocal rank.
+    # Each retriever contributes HYBRID_CANDIDATES results; RETRIEVAL_K reach the prompt.
+    HYBRID_SEARCH_ENABLED: bool = True
+    BM25_INDEX_PATH: str = "/tmp/bm25_index.sqlite3"
+    HYBRID_CANDIDATES: int = 20
+    RRF_K: int = 60
+    RETRIEVAL_K: int = 5
+
+    # Post-retrieval: RETRIEVAL_FETCH_K candidates are retrieved, overlapping chunks
+    # of the same page are merged, and maximal marginal relevance picks at most
+    # RETRIEVAL_K chunks' worth (MMR_LAMBDA: 1 = rank only, 0 = diversity only).
+    RETRIEVAL_FETCH_K: int = 10
+    MMR_LAMBDA: float = 0.7
+
+    # Prompt size cap (rules + context + question). Context is packed in rank
+    # order and the last chunk is cut at a sentence boundary.
+    # PROMPT_TOKENIZER: "heuristic" (no dependencies) or "tiktoken" (optional package).
+    PROMPT_TOKEN_BUDGET: int = 2048
+    PROMPT_TOKENIZER: str = "heuristic"
+
+    # Document and workspace metadata (SQLite, WAL mode). Empty keeps it in memory only.
+    METADATA_DB_PATH: str = "/tmp/metadata.sqlite3"
+
+    # Rate limiting (sliding-window counter per API key).
+    # "memory" limits each worker separately; "sqlite" shares one limit across
+    # all workers on the host through RATE_LIMIT_DB_PATH.
+    RATE_LIMIT: int = 10
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_DB_PATH: str = "/tmp/rate_limit.sqlite3"
+
+    # Semantic answer cache: a question reuses a cached answer from the same
+    # workspace when their query embeddings have cosine similarity >= threshold.
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIZE: int = 512
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+
+    # Conversation sessions (session_id on /chat and /chat/stream): up to
+    # SESSION_MAX_COUNT sessions, each dropped SESSION_TTL_SECONDS after its last
+    # question and keeping its last SESSION_MAX_TURNS turns. History is condensed,
+    # newest turn first, into at most SESSION_HISTORY_TOKENS of PROMPT_TOKEN_BUDGET.
+    # A follow-up reuses the session's retrieved chunks without retrieving when its
+    # query embedding has cosine similarity >= SESSION_REUSE_SIMILARITY with the
+    # previous one; otherwise SESSION_EXTEND_K new chunks are retrieved and added,
+    # keeping at most SESSION_MAX_CHUNKS.
+    SESSION_MAX_COUNT: int = 1000
+    SESSION_TTL_SECONDS: int = 1800
+    SESSION_MAX_TURNS: int = 10
+    SESSION_HISTORY_TOKENS: int = 512
+    SESSION_REUSE_SIMILARITY: float = 0.8
+    SESSION_EXTEND_K: int = 5
+    SESSION_MAX_CHUNKS: int = 20
+
+    # Batch chat (/api/v1/chat/batch): questions per request, and how many
+    # LLM generations run at once (retrievals are not limited). A batch counts
+    # as ceil(questions / RATE_LIMIT_BATCH_QUESTIONS) requests against RATE_LIMIT.
+    BATCH_CHAT_MAX_QUESTIONS: int = 300
+    BATCH_CHAT_MAX_CONCURRENCY: int = 4
+    RATE_LIMIT_BATCH_QUESTIONS: int = 50
+
+    # Add a Server-Timing header with per-stage durations (workspace,
+    # embed_query, retrieval, prompt, generation, ...) to every response.
+    # Streaming responses only cover the stages before the stream starts.
+    # Stage histograms and counters are always exported on GET /metrics.
+    TIMING_HEADER_ENABLED: bool = False
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,39 @@
+# backend/app/core/lazy.py
+
+import importlib
+from types import ModuleType
+from typing import Any, Optional
+
+
+class _LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            # import_module is thread-safe (per-module import locks)
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    """
+    `np = lazy_import("numpy")` behaves like `import numpy as np`, except
+    that numpy is only imported when `np.<something>` is first used.
+
+    Used for heavy dependencies (LangChain, Pinecone, Groq, HF, pypdf, NumPy)
+    so that importing the app - and serving /health - stays fast on cold starts.
+    """
+    return _LazyModule(name)
@@ -0,0 +1,302 @@
+# backend/app/core/metrics.py
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Default histogram buckets (seconds): 1 ms .. 30 s
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    """
+    Collects metrics and renders them in the Prometheus text format (0.0.4).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", self._labels(key), value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> Iterable[Sample]:
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_bucket", {**labels, "le": "+Inf"}, count
+            yield "_sum", labels, total
+            yield "_count", labels, count
+
+
+class CallbackMetric(_Metric):
+    """
+    Values read at scrape time, for state that is already counted elsewhere
+    (e.g. cache hit counters): `callback` returns [(labels, value), ...].
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+        type: str = "gauge",
+        labelnames: Sequence[str] = (),
+        registry: Registry = REGISTRY
+    ):
+        super().__init__(name, help, labelnames, registry)
+        self.type = type
+        self._callback = callback
+
+    def samples(self) -> Iterable[Sample]:
+        try:
+            values = list(self._callback())
+        except Exception as e:
+            print(f"⚠️ Metric callback {self.name} failed: {e}")
+            return
+        for labels, value in values:
+            yield "", labels, value
+
+
+# ----------------------------------------------------------------- app metrics
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent per pipeline stage (chat: per request; ingest: per page or per batch).",
+    labelnames=("pipeline", "stage")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until response headers are sent.",
+    labelnames=("method", "route", "status")
+)
+EMBED_RETRIES = Counter(
+    "rag_embedding_retries_total",
+    "Embedding requests retried after a failed attempt.",
+    labelnames=("mode",)
+)
+LLM_ERRORS = Counter(
+    "rag_llm_errors_total",
+    "LLM generation calls that failed.",
+    labelnames=("mode",)
+)
+PROMPT_TOKENS = Histogram(
+    "rag_prompt_tokens",
+    "Prompt size in tokens, as counted by the prompt packer.",
+    buckets=(128, 256, 512, 1024, 1536, 2048, 3072, 4096, 8192)
+)
+QUERY_EMBED_BATCH_SIZE = Histogram(
+    "rag_query_embedding_batch_size",
+    "Distinct questions per coalesced query-embedding call.",
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INGEST_CHUNKS = Counter(
+    "rag_ingest_chunks_total",
+    "Chunks processed by ingestion.",
+    labelnames=("result",)
+)
+SESSION_RETRIEVALS = Counter(
+    "rag_session_retrievals_total",
+    "Context for questions asked in a session: full retrieval, extended or reused as is.",
+    labelnames=("result",)
+)
+RATE_LIMITED = Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter."
+)
+
+
+# Caches keep their own hit/miss counters; they are read at scrape time.
+# name -> callable returning a stats() dict (or None if not created yet)
+_caches: Dict[str, Callable[[], Optional[Dict]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Optional[Dict]]):
+    _caches[name] = stats
+
+
+def _cache_values(field: str) -> Iterable[Tuple[Dict[str, str], float]]:
+    for name, stats in list(_caches.items()):
+        try:
+            values = stats()
+        except Exception as e:
+            print(f"⚠️ Cache stats for {name} failed: {e}")
+            continue
+        if values is not None and field in values:
+            yield {"cache": name}, values[field]
+
+
+CallbackMetric("rag_cache_hits_total", "Cache hits.", lambda: _cache_values("hits"), type="counter", labelnames=("cache",))
+CallbackMetric("rag_cache_misses_total", "Cache misses.", lambda: _cache_values("misses"), type="counter", labelnames=("cache",))
+CallbackMetric("rag_cache_entries", "Entries currently cached.", lambda: _cache_values("size"), labelnames=("cache",))
+
+
+# ---------------------------------------------------------------------- spans
+
+# Per-request list of (stage, seconds); None outside a timed request
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def record(stage: str, seconds: float, pipeline: str = "chat"):
+    """
+    Observe a stage duration in rag_stage_duration_seconds and, inside a
+    timed HTTP request, add it to that request's Server-Timing breakdown.
+    """
+    STAGE_SECONDS.observe(seconds, pipeline=pipeline, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str, pipeline: str = "chat") -> Iterator[None]:
+    """
+    Time a block and record() it (also when the block raises).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started, pipeline)
+
+
+def timed_iter(iterable: Iterable, stage: str, pipeline: str = "ingest") -> Iterator:
+    """
+    Yield from `iterable`, timing how long each item takes to produce.
+    """
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        record(stage, time.perf_counter() - started, pipeline)
+        yield item
+
+
+def start_request_timing() -> List[Tuple[str, float]]:
+    """
+    Begin collecting spans for the current request (call from middleware).
+    Tasks and threads started from it (asyncio.to_thread) share the list.
+    """
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: List[Tuple[str, float]], total_seconds: float) -> str:
+    """
+    Server-Timing header value; repeated stages are summed, durations in ms.
+    """
+    totals: Dict[str, float] = {}
+    for stage, seconds in list(timings):
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
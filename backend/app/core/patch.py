@@ -1,11 +1,34 @@
 import multiprocessing
 import multiprocessing.synchronize
 
+# True once SemLock has been replaced. Code that needs real process-shared
+# semaphores (e.g. a ProcessPoolExecutor) must check this first.
+SEMLOCK_PATCHED = False
+
+
+def _semlock_supported() -> bool:
+    """
+    Probe for working POSIX semaphores (they need /dev/shm).
+    """
+    try:
+        multiprocessing.synchronize.Lock(ctx=multiprocessing.get_context())
+        return True
+    except (OSError, ImportError):
+        return False
+
+
 def apply_patches():
     """
     Monkeypatch multiprocessing.SemLock to prevent [Errno 2] No such file or directory
     on Vercel/AWS Lambda where /dev/shm is missing.
+
+    Hosts with working semaphores are left untouched, so process pools keep working there.
     """
+    global SEMLOCK_PATCHED
+
+    if SEMLOCK_PATCHED or _semlock_supported():
+        return
+
     try:
         # Define a dummy lock that implements the necessary interface
         class DummyLock:
@@ -17,11 +40,12 @@ def apply_patches():
 
         # Patch directly on the synchronize module
         multiprocessing.synchronize.SemLock = DummyLock
-        
+
         # Also try to patch the top-level alias if it exists
         if hasattr(multiprocessing, 'SemLock'):
             multiprocessing.SemLock = DummyLock
-            
+
+        SEMLOCK_PATCHED = True
         print("✅ Applied multiprocessing.SemLock monkeypatch for Serverless environment.")
     except Exception as e:
         print(f"⚠️ Failed to patch SemLock: {e}")
@@ -0,0 +1,122 @@
+# backend/app/core/profiler.py
+
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Set STARTUP_PROFILE=1 in the process environment (not .env: this runs
+# before settings are loaded) to print an import-time breakdown at startup.
+ENV_VAR = "STARTUP_PROFILE"
+
+
+class ImportProfiler:
+    """
+    Meta-path hook that times every module executed after start().
+
+    The real import machinery still finds and loads modules; the profiler
+    only wraps each module's exec_module to record its cumulative time
+    (including nested imports) and self time (excluding them).
+    """
+
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        # module -> (self_seconds, cumulative_seconds)
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self._stack = threading.local()
+        self._installed = False
+
+    # --------------------------------------------------------- meta path hook
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Builtin/frozen importers are classes shared by every module: leave them be
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                loader.exec_module = self._timed(fullname, loader.exec_module)
+            return spec
+        return None
+
+    def _timed(self, name: str, exec_module):
+        def timed_exec_module(module):
+            stack = getattr(self._stack, "frames", None)
+            if stack is None:
+                stack = self._stack.frames = []
+            stack.append(0.0)  # time spent in nested imports
+            started = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - started
+                nested = stack.pop()
+                if stack:
+                    stack[-1] += cumulative
+                self.timings[name] = (cumulative - nested, cumulative)
+        return timed_exec_module
+
+    # ------------------------------------------------------------------- API
+
+    def start(self):
+        if self._installed:
+            return
+        self.started_at = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        self._installed = True
+
+    def stop(self):
+        if self._installed:
+            sys.meta_path.remove(self)
+            self._installed = False
+
+    def packages(self) -> List[Tuple[str, float]]:
+        """
+        Self time summed per top-level package, slowest first.
+        """
+        totals: Dict[str, float] = {}
+        for name, (self_seconds, _) in self.timings.items():
+            package = name.split(".")[0]
+            totals[package] = totals.get(package, 0.0) + self_seconds
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def report(self, label: str, top: int = 25) -> str:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        lines = [
+            f"⏱️ {label}: {elapsed * 1000:.0f} ms, {len(self.timings)} modules imported",
+            f"{'cumulative ms':>14} {'self ms':>9}  module"
+        ]
+        slowest = sorted(self.timings.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (self_seconds, cumulative) in slowest:
+            lines.append(f"{cumulative * 1000:>14.1f} {self_seconds * 1000:>9.1f}  {name}")
+
+        lines.append(f"{'self ms':>14}  top-level package")
+        for package, seconds in self.packages()[:top]:
+            lines.append(f"{seconds * 1000:>14.1f}  {package}")
+        return "\n".join(lines)
+
+
+profiler = ImportProfiler()
+
+
+def enabled() -> bool:
+    return os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes")
+
+
+def start_if_enabled():
+    if enabled():
+        profiler.start()
+
+
+def report_if_enabled(label: str):
+    """
+    Print the report and remove the hook: imports after startup (the lazy
+    RAG modules) run untimed.
+    """
+    if enabled():
+        print(profiler.report(label))
+        profiler.stop()
@@ -1,42 +1,226 @@
 # backend/app/core/rate_limiter.py
 
+import asyncio
+import inspect
+import math
+import os
+import sqlite3
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
 from fastapi import HTTPException, status
 
-RATE_LIMIT = 10          # requests
-WINDOW_SECONDS = 60      # per minute
+from app.core import metrics
+from app.core.config import settings
 
-_request_log = defaultdict(list)
 
+def _sliding_window(
+    state: Optional[Tuple[int, int, int]],
+    now: float,
+    window_seconds: float
+) -> Tuple[int, int, int, float]:
+    """
+    Sliding-window counter: the previous fixed window's count is weighted by
+    how much of it still overlaps the sliding window ending at `now`.
 
-def rate_limiter(endpoint_func):
-    @wraps(endpoint_func)
-    def wrapper(*args, **kwargs):
-        api_key = kwargs.get("api_key")
+    Returns (window, current_count, previous_count, estimated_count).
+    """
+    window = math.floor(now / window_seconds)
+    if state is None:
+        current, previous = 0, 0
+    else:
+        last_window, current, previous = state
+        if window == last_window + 1:
+            current, previous = 0, current
+        elif window != last_window:
+            current, previous = 0, 0
+
+    overlap = 1.0 - (now - window * window_seconds) / window_seconds
+    return window, current, previous, previous * overlap + current
 
-        if not api_key:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Missing API key"
-            )
 
+class InMemoryRateLimitBackend:
+    """
+    Per-process limiter. O(1) per check, a few ints per key, and keys idle
+    for two windows are evicted (least recently used first).
+    """
+
+    blocking_io = False
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = 100_000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (window, current_count, previous_count, last_seen), LRU order
+        self._state: "OrderedDict[str, Tuple[int, int, int, float]]" = OrderedDict()
+
+    def hit(self, key: str, cost: int = 1) -> bool:
         now = time.time()
-        window_start = now - WINDOW_SECONDS
+        with self._lock:
+            state = self._state.get(key)
+            window, current, previous, estimated = _sliding_window(
+                state[:3] if state else None, now, self.window_seconds
+            )
+            allowed = estimated + cost <= self.limit
+            if allowed:
+                current += cost
+
+            self._state[key] = (window, current, previous, now)
+            self._state.move_to_end(key)
+            self._evict(now)
+            return allowed
+
+    def _evict(self, now: float):
+        idle_after = 2 * self.window_seconds
+        while self._state:
+            oldest_key, oldest = next(iter(self._state.items()))
+            if now - oldest[3] < idle_after and len(self._state) <= self.max_keys:
+                break
+            del self._state[oldest_key]
+
+
+class SQLiteRateLimitBackend:
+    """
+    Limiter state in a SQLite file, so every uvicorn worker on the host
+    enforces one shared limit. Each check is one short IMMEDIATE transaction.
+    """
+
+    blocking_io = True
+
+    # Idle-row cleanup runs on every Nth check
+    _EVICT_EVERY = 256
+
+    def __init__(self, limit: int, window_seconds: float, path: str):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.path = path
+        self._local = threading.local()
+        self._checks = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            " key TEXT PRIMARY KEY,"
+            " window INTEGER NOT NULL,"
+            " current INTEGER NOT NULL,"
+            " previous INTEGER NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit mode, transactions are explicit
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
 
-        # Remove timestamps outside the window
-        _request_log[api_key] = [
-            t for t in _request_log[api_key] if t > window_start
-        ]
+    def hit(self, key: str, cost: int = 1) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window, current, previous, estimated = _sliding_window(row, now, self.window_seconds)
+            allowed = estimated + cost <= self.limit
+            if allowed:
+                current += cost
 
-        if len(_request_log[api_key]) >= RATE_LIMIT:
-            raise HTTPException(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded"
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)",
+                (key, window, current, previous, now)
             )
 
-        _request_log[api_key].append(now)
+            self._checks += 1
+            if self._checks % self._EVICT_EVERY == 0:
+                conn.execute(
+                    "DELETE FROM rate_limits WHERE last_seen < ?",
+                    (now - 2 * self.window_seconds,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed
+
+
+def _create_backend():
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "memory":
+        return InMemoryRateLimitBackend(settings.RATE_LIMIT, settings.RATE_LIMIT_WINDOW_SECONDS)
+    if backend == "sqlite":
+        return SQLiteRateLimitBackend(
+            settings.RATE_LIMIT, settings.RATE_LIMIT_WINDOW_SECONDS, settings.RATE_LIMIT_DB_PATH
+        )
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+
+_backend = _create_backend()
+
+
+def _check_api_key(api_key):
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing API key"
+        )
+
+
+def _enforce(allowed: bool):
+    if not allowed:
+        metrics.RATE_LIMITED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded"
+        )
+
+
+def rate_limiter(endpoint_func: Optional[Callable] = None, *, cost: Optional[Callable[[Dict], int]] = None):
+    """
+    Works on both sync and async endpoints. For async endpoints a blocking
+    (shared) backend is consulted off the event loop.
+
+    `@rate_limiter` counts one request per call; `@rate_limiter(cost=fn)`
+    counts fn(endpoint kwargs) requests, for endpoints doing several
+    requests' worth of work (capped at RATE_LIMIT so a call can always pass).
+    """
+    if endpoint_func is None:
+        return lambda func: rate_limiter(func, cost=cost)
+
+    def _cost(kwargs: Dict) -> int:
+        if cost is None:
+            return 1
+        return max(1, min(cost(kwargs), settings.RATE_LIMIT))
+
+    if inspect.iscoroutinefunction(endpoint_func):
+        @wraps(endpoint_func)
+        async def async_wrapper(*args, **kwargs):
+            api_key = kwargs.get("api_key")
+            _check_api_key(api_key)
+            if _backend.blocking_io:
+                allowed = await asyncio.to_thread(_backend.hit, api_key, _cost(kwargs))
+            else:
+                allowed = _backend.hit(api_key, _cost(kwargs))
+            _enforce(allowed)
+            return await endpoint_func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(endpoint_func)
+    def wrapper(*args, **kwargs):
+        api_key = kwargs.get("api_key")
+        _check_api_key(api_key)
+        _enforce(_backend.hit(api_key, _cost(kwargs)))
         return endpoint_func(*args, **kwargs)
 
     return wrapper
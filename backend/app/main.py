@@ -1,7 +1,13 @@
-from app.core import patch # apply patches immediately
-from fastapi import FastAPI
+from app.core import profiler # must come first: times every import below
+profiler.start_if_enabled()
+
+from app.core import patch # apply patches immediately (once; SemLock only where needed)
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import asyncio
 import os
+import time
 
 # Serverless Hack: Ensure HOME and specialized dirs point to /tmp
 # This prevents libraries like huggingface_hub or matplotlib from crashing
@@ -10,25 +16,15 @@ os.environ["MPLCONFIGDIR"] = "/tmp/matplotlib"
 os.environ["TRANSFORMERS_CACHE"] = "/tmp/transformers"
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-# MONKEYPATCH: Fix for "OSError: [Errno 38] Function not implemented" or Errno 2 on Vercel
-# Vercel/AWS Lambda doesn't support multiprocessing.SemLock (no /dev/shm).
-# We mock it to allow libraries to import without crashing, assuming single-threaded execution.
-import multiprocessing.synchronize
-def _sem_lock_patch(*args, **kwargs):
-    # Return a dummy context manager that does nothing
-    class DummyLock:
-        def __enter__(self): return self
-        def __exit__(self, *args): pass
-        def acquire(self, *args, **kwargs): return True
-        def release(self, *args, **kwargs): pass
-    return DummyLock()
-
-multiprocessing.synchronize.SemLock = _sem_lock_patch
-# End Monkeypatch
-
-from app.api.chat import router as chat_router
+# Routers import no RAG dependencies at module level: LangChain, Pinecone,
+# Groq, HF and pypdf load on first use (see app.core.lazy), so cold starts
+# and /health stay fast.
+from app.api.chat import router as chat_router, rag_service
 from app.api.documents import router as documents_router
+from app.services.document_service import document_service
 from app.api.workspaces import router as workspaces_router
+from app.core import metrics
+from app.core.config import settings
 
 # NOTE: Removed auto-creation of Pinecone Index.
 # Vercel Serverless Functions have a 10s timeout, and index creation takes 60s+.
@@ -50,11 +46,48 @@ app.add_middleware(
     allow_headers=["*", "x-api-key"],
 )
 
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    # Spans recorded while handling this request (app.core.metrics.span) are
+    # collected here; the route template keeps the label set bounded.
+    timings = metrics.start_request_timing()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        elapsed,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    if settings.TIMING_HEADER_ENABLED:
+        response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+@app.on_event("startup")
+async def backfill_document_ids():
+    # One-off: chunks indexed before they carried a document ID
+    await asyncio.to_thread(document_service.backfill_document_ids)
+
+@app.on_event("shutdown")
+async def close_clients():
+    # Close pooled keep-alive connections held by the async RAG clients
+    await rag_service.aclose()
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition: stage latencies, retries, cache hits, prompt tokens
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 # Register API routes
 app.include_router(chat_router)
 app.include_router(documents_router, prefix="/api/v1")
 app.include_router(workspaces_router, prefix="/api/v1")
+
+profiler.report_if_enabled("app.main import")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Literal
+from typing import Literal, Optional
 
 class DocumentMetadata(BaseModel):
     id: str
@@ -8,3 +8,19 @@ class DocumentMetadata(BaseModel):
     upload_timestamp: datetime = datetime.now()
     status: Literal["processing", "available", "error"] = "processing"
     page_count: int = 0
+    job_id: Optional[str] = None
+
+class IngestionJob(BaseModel):
+    id: str
+    document_id: str
+    filename: str
+    status: Literal["queued", "processing", "available", "error"] = "queued"
+    pages_extracted: int = 0
+    chunks_embedded: int = 0
+    chunks_upserted: int = 0
+    chunks_skipped: int = 0
+    chunks_reused: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -1,7 +1,9 @@
 # backend/app/models/schemas.py
 
 from pydantic import BaseModel, Field
-from typing import List
+from typing import Annotated, List, Optional
+
+from app.core.config import settings
 
 
 class ChatRequest(BaseModel):
@@ -14,6 +16,23 @@ class ChatRequest(BaseModel):
         ...,
         description="ID of the workspace boundary to retrieve from"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Conversation to continue (from a previous response); omit to start one"
+    )
+
+
+class BatchChatRequest(BaseModel):
+    questions: List[Annotated[str, Field(min_length=3)]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BATCH_CHAT_MAX_QUESTIONS,
+        description="Questions to answer against the same workspace"
+    )
+    workspace_id: str = Field(
+        ...,
+        description="ID of the workspace boundary to retrieve from"
+    )
 
 
 class Citation(BaseModel):
@@ -25,6 +44,7 @@ class Citation(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     citations: List[Citation]
+    session_id: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,337 @@
+# backend/app/rag/bm25.py
+
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+from app.rag.chunk_store import get_chunk_store
+from app.rag.scope import DocumentFilter, filter_values
+
+# Metadata fields keyword search can filter on (columns of the chunks table)
+FILTER_FIELDS = ("doc_name", "doc_id")
+
+# Dotted / hyphenated identifiers stay one token: "4.2", "2016-679"
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which will with".split()
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of `text`, stopwords removed.
+
+    A word followed by a number also yields the pair as one term
+    ("Article 17" -> "article", "17", "article 17"), so exact clause
+    references outrank passages that merely mention "article" and "17".
+    """
+    raw = _TOKEN_RE.findall(text.lower())
+    terms = [token for token in raw if token not in _STOPWORDS]
+    for word, number in zip(raw, raw[1:]):
+        if word.isalpha() and word not in _STOPWORDS and number[0].isdigit():
+            terms.append(f"{word} {number}")
+    return terms
+
+
+def _filter_clause(filter: Optional[Dict]) -> Tuple[str, List]:
+    """
+    SQL condition for the metadata filters the vector stores accept on
+    doc_name or doc_id: {field: {"$in": [...]}}, {field: {"$eq": x}} or {field: x}.
+
+    The value list is bound as one JSON parameter, so a scope of thousands
+    of documents stays a single, constant-size statement (a DocumentFilter
+    brings it precomputed).
+    """
+    if not filter:
+        return "", []
+
+    clauses, params = [], []
+    for field, condition in filter.items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unsupported filter field for keyword search: {field}")
+        if isinstance(filter, DocumentFilter) and field == "doc_id":
+            if not filter.doc_ids:
+                return " AND 0", []
+            values_json = filter.doc_ids_json
+        else:
+            values = filter_values(condition)
+            if not values:
+                return " AND 0", []
+            values_json = json.dumps(values)
+        clauses.append(f"c.{field} IN (SELECT value FROM json_each(?))")
+        params.append(values_json)
+    return " AND " + " AND ".join(clauses), params
+
+
+CHUNKS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    doc_name TEXT NOT NULL,
+    doc_id TEXT,
+    length INTEGER NOT NULL,
+    metadata TEXT NOT NULL
+"""
+
+
+class BM25Index:
+    """
+    Inverted keyword index over the same chunks as the vector store (SQLite).
+
+    Chunks are added as they are upserted during ingestion and removed with
+    stale chunks, so the index never needs a rebuild. Searches accept the
+    same doc_id / doc_name filters as vector search and only score postings
+    of the filtered documents.
+
+    Only terms and metadata are stored: matches come back without text, like
+    vector matches, and are hydrated from the chunk store. The corpus size
+    and total length BM25 needs are kept as running totals, updated with
+    every add and delete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        else:
+            # Private in-memory databases are per connection; share one instead
+            self.path = "file:bm25?mode=memory&cache=shared"
+            self._keepalive = self._conn()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS chunks ({CHUNKS_COLUMNS});
+            -- Running totals over chunks, for BM25's average length and idf
+            CREATE TABLE IF NOT EXISTS corpus (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                doc_count INTEGER NOT NULL,
+                total_length INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_doc_name ON chunks (doc_name);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                chunk INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, chunk)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings (chunk);
+            """
+        )
+        # Indexes created before chunks carried a stable document ID
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+        if "doc_id" not in columns:
+            conn.execute("ALTER TABLE chunks ADD COLUMN doc_id TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)")
+        if "text" in columns:
+            self._migrate_text(conn)
+        conn.execute(
+            "INSERT OR IGNORE INTO corpus SELECT 0, COUNT(*), TOTAL(length) FROM chunks"
+        )
+        conn.commit()
+
+    @staticmethod
+    def _migrate_text(conn: sqlite3.Connection):
+        """
+        Indexes created before chunk text moved to the chunk store kept a
+        copy of it; move it there (chunks indexed before then have no other
+        copy) and drop the column.
+        """
+        print("⚠️ Moving keyword index text to the chunk store...")
+        rows = conn.execute(
+            "SELECT chunk_id, text FROM chunks WHERE text != ''"
+        ).fetchall()
+        store = get_chunk_store()
+        stored = store.get_many([chunk_id for chunk_id, _ in rows])
+        store.put((chunk_id, text) for chunk_id, text in rows if chunk_id not in stored)
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            conn.execute("ALTER TABLE chunks DROP COLUMN text")
+            return
+        # No DROP COLUMN before SQLite 3.35: rebuild the table without it,
+        # keeping row ids (postings refer to them)
+        conn.execute(f"CREATE TABLE chunks_rebuilt ({CHUNKS_COLUMNS})")
+        conn.execute(
+            "INSERT INTO chunks_rebuilt SELECT id, chunk_id, doc_name, doc_id, length, metadata FROM chunks"
+        )
+        conn.execute("DROP TABLE chunks")
+        conn.execute("ALTER TABLE chunks_rebuilt RENAME TO chunks")
+        conn.execute("CREATE INDEX chunks_doc_name ON chunks (doc_name)")
+        conn.execute("CREATE INDEX chunks_doc_id ON chunks (doc_id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, uri=self.path.startswith("file:"), timeout=5)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _update_corpus(conn: sqlite3.Connection, doc_count: int, total_length: int):
+        conn.execute(
+            "UPDATE corpus SET doc_count = doc_count + ?, total_length = total_length + ? WHERE id = 0",
+            (doc_count, total_length)
+        )
+
+    def _delete_rows(self, conn: sqlite3.Connection, chunk_ids: List[str]):
+        removed = removed_length = 0
+        for chunk_id in chunk_ids:
+            row = conn.execute("SELECT id, length FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row:
+                conn.execute("DELETE FROM postings WHERE chunk = ?", (row[0],))
+                conn.execute("DELETE FROM chunks WHERE id = ?", (row[0],))
+                removed += 1
+                removed_length += row[1]
+        if removed:
+            self._update_corpus(conn, -removed, -removed_length)
+
+    def add(self, chunks: Iterable[Document]):
+        """
+        Index chunks (re-adding a chunk_id replaces its previous entry).
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return
+
+        with self._write_lock:
+            conn = self._conn()
+            self._delete_rows(conn, [chunk.metadata["chunk_id"] for chunk in chunks])
+            added_length = 0
+            for chunk in chunks:
+                terms = Counter(tokenize(chunk.page_content))
+                length = sum(terms.values())
+                metadata = {key: value for key, value in chunk.metadata.items() if key != "text"}
+                cursor = conn.execute(
+                    "INSERT INTO chunks (chunk_id, doc_name, doc_id, length, metadata)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (
+                        chunk.metadata["chunk_id"],
+                        chunk.metadata["doc_name"],
+                        chunk.metadata.get("doc_id"),
+                        length,
+                        json.dumps(metadata)
+                    )
+                )
+                conn.executemany(
+                    "INSERT INTO postings VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()]
+                )
+                added_length += length
+            self._update_corpus(conn, len(chunks), added_length)
+            conn.commit()
+
+    def delete(self, chunk_ids: List[str]):
+        if not chunk_ids:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            self._delete_rows(conn, chunk_ids)
+            conn.commit()
+
+    def set_doc_id(self, chunk_ids: List[str], document_id: str):
+        """
+        Assign indexed chunks to a document (chunks indexed before they
+        carried a document ID).
+        """
+        if not chunk_ids:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "UPDATE chunks SET doc_id = ? WHERE chunk_id IN (SELECT value FROM json_each(?))",
+                (document_id, json.dumps(chunk_ids))
+            )
+            conn.commit()
+
+    def search(self, query: str, k: int = 5, filter: Optional[Dict] = None) -> List[Document]:
+        """
+        Top-k chunks by BM25 score, restricted to `filter`. Like vector
+        matches, they carry no text; see ChunkStore.hydrate.
+        """
+        return [doc for doc, _ in self.search_with_score(query, k=k, filter=filter)]
+
+    def search_with_score(
+        self,
+        query: str,
+        k: int = 5,
+        filter: Optional[Dict] = None
+    ) -> List[Tuple[Document, float]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+
+        conn = self._conn()
+        doc_count, total_length = conn.execute("SELECT doc_count, total_length FROM corpus").fetchone()
+        if not doc_count:
+            return []
+        avg_length = total_length / doc_count
+
+        term_params = ",".join("?" * len(terms))
+        idf = {
+            term: math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for term, df in conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({term_params}) GROUP BY term",
+                terms
+            )
+        }
+        if not idf:
+            return []
+
+        condition, filter_params = _filter_clause(filter)
+        scores: Dict[int, float] = {}
+        for term, chunk, tf, length in conn.execute(
+            "SELECT p.term, p.chunk, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk"
+            f" WHERE p.term IN ({term_params}){condition}",
+            terms + filter_params
+        ):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            scores[chunk] = scores.get(chunk, 0.0) + idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        if not top:
+            return []
+
+        rows = {
+            row[0]: row
+            for row in conn.execute(
+                f"SELECT id, chunk_id, metadata FROM chunks WHERE id IN ({','.join('?' * len(top))})",
+                [chunk for chunk, _ in top]
+            )
+        }
+        return [
+            (
+                Document(id=rows[chunk][1], page_content="", metadata=json.loads(rows[chunk][2])),
+                score
+            )
+            for chunk, score in top
+        ]
+
+
+# Singleton-style accessor
+_bm25_index: Optional[BM25Index] = None
+_bm25_index_lock = threading.Lock()
+
+
+def get_bm25_index() -> BM25Index:
+    global _bm25_index
+    with _bm25_index_lock:
+        if _bm25_index is None:
+            _bm25_index = BM25Index(settings.BM25_INDEX_PATH or ":memory:")
+    return _bm25_index
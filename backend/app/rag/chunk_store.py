@@ -0,0 +1,137 @@
+# backend/app/rag/chunk_store.py
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.config import settings
+
+# Bound parameters per lookup (older SQLite builds allow at most 999)
+MAX_IDS_PER_QUERY = 500
+
+
+def _batches(ids: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+        yield ids[i:i + MAX_IDS_PER_QUERY]
+
+
+class ChunkStore:
+    """
+    Chunk text keyed by chunk_id (SQLite).
+
+    The vector index only holds IDs and the small metadata used for
+    filtering and citations; retrieved chunks are hydrated from here with
+    one batched lookup. Text is written before its vector is upserted, so
+    every chunk the index can return has its text available.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        else:
+            # Private in-memory databases are per connection; share one instead
+            self.path = "file:chunk_store?mode=memory&cache=shared"
+            self._keepalive = self._conn()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_text (
+                chunk_id TEXT PRIMARY KEY,
+                text TEXT NOT NULL
+            ) WITHOUT ROWID
+            """
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, uri=self.path.startswith("file:"), timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def put(self, chunks: Iterable[Tuple[str, str]]):
+        """
+        Store (chunk_id, text) pairs, replacing existing ones.
+        """
+        rows = list(chunks)
+        if not rows:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            conn.executemany("INSERT OR REPLACE INTO chunk_text VALUES (?, ?)", rows)
+            conn.commit()
+
+    def get_many(self, chunk_ids: List[str]) -> Dict[str, str]:
+        """
+        chunk_id -> text for the IDs that are stored.
+        """
+        ids = list(dict.fromkeys(chunk_ids))
+        conn = self._conn()
+        texts: Dict[str, str] = {}
+        for batch in _batches(ids):
+            texts.update(conn.execute(
+                f"SELECT chunk_id, text FROM chunk_text WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                batch
+            ))
+        return texts
+
+    def delete(self, chunk_ids: List[str]):
+        if not chunk_ids:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            for batch in _batches(list(chunk_ids)):
+                conn.execute(
+                    f"DELETE FROM chunk_text WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                    batch
+                )
+            conn.commit()
+
+    def hydrate(self, docs: List[Document]) -> List[Document]:
+        """
+        Fill in the text of retrieved chunks that came back without it.
+
+        Chunks that already carry text (vectors indexed before text moved out
+        of the index) are left as they are; a chunk whose text is missing is
+        dropped, since it cannot be cited.
+        """
+        missing = [doc for doc in docs if not doc.page_content]
+        if not missing:
+            return docs
+
+        texts = self.get_many([doc.metadata.get("chunk_id") or doc.id for doc in missing])
+        hydrated = []
+        for doc in docs:
+            if not doc.page_content:
+                text = texts.get(doc.metadata.get("chunk_id") or doc.id)
+                if text is None:
+                    print(f"⚠️ No stored text for chunk {doc.metadata.get('chunk_id') or doc.id}; skipped.")
+                    continue
+                doc.page_content = text
+            hydrated.append(doc)
+        return hydrated
+
+
+# Singleton-style accessor
+_chunk_store: Optional[ChunkStore] = None
+_chunk_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _chunk_store
+    with _chunk_store_lock:
+        if _chunk_store is None:
+            _chunk_store = ChunkStore(settings.CHUNK_STORE_PATH or ":memory:")
+    return _chunk_store
@@ -0,0 +1,176 @@
+# backend/app/rag/chunker.py
+
+import re
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+_H = r"[^\S\n]"  # whitespace within a line
+
+# A line that opens a new part of a regulation or policy: "Article 17",
+# "CHAPTER III", "Section 2.1 Data retention", "§ 4". Must be the whole line,
+# so a wrapped reference such as "Article 8(1). " is not taken for one.
+# A trailing period marks the end of a wrapped sentence ("Article 263 TFEU.").
+_HEADING = (
+    rf"(?:ARTICLE|Article|SECTION|Section|CHAPTER|Chapter|PART|Part|ANNEX|Annex|§){_H}*"
+    r"[0-9IVXLC]+[a-z]?(?:\.\d+)*"
+    rf"(?:{_H}*[-–—:]?{_H}*[A-Z](?:[^\n]{{0,59}}[^\s.;,])?)?"
+)
+# Numbered clauses and recitals: "1. ", "2.3 ", "(a) ", "(23) ", "iv) "
+_CLAUSE = r"(?:\d{1,3}\.(?:\d{1,3}\.?)*|\(\d{1,3}[a-z]?\)|\(?[a-z]{1,4}\))"
+
+# Every heading line and clause start of a page, in one scan
+_BOUNDARY_RE = re.compile(
+    rf"^{_H}*(?:(?P<heading>{_HEADING}){_H}*$|{_CLAUSE}{_H}+(?=\S))",
+    re.MULTILINE
+)
+# A bare label, whose title usually follows on the next line
+_LABEL_ONLY_RE = re.compile(r"\S+\s*[0-9IVXLC]+[a-z]?(?:\.\d+)*")
+_CLAUSE_RE = re.compile(_CLAUSE + r"\s")
+# A sentence: from a non-space character up to [.!?;] followed by whitespace
+_SENTENCE_RE = re.compile(r"\S(?:[^.!?;]+|[.!?;](?!\s))*[.!?;]?")
+
+MAX_HEADING_CHARS = 120
+
+HEADING, CLAUSE, TEXT = "heading", "clause", "text"
+
+
+class _Unit:
+    """
+    A sentence-sized span [start, end) of the page text.
+    """
+
+    __slots__ = ("start", "end", "section")
+
+    def __init__(self, start: int, end: int, section: Optional[str]):
+        self.start = start
+        self.end = end
+        self.section = section
+
+
+class StructureChunker:
+    """
+    Splits extracted pages on regulatory structure.
+
+    A new chunk starts at every heading (article, section, chapter), and
+    numbered clauses are preferred split points. Text that still does not
+    fit in `chunk_size` characters is split by sentences, with about
+    `chunk_overlap` characters of trailing sentences repeated in the next
+    chunk (a sentence longer than a chunk is cut at whitespace).
+
+    Each page is scanned a constant number of times, so chunking is linear in
+    the text length. Chunks never cross pages, so citations stay exact; every
+    chunk is an exact substring of its page, with start_index/end_index
+    offsets and the section heading in effect where it starts. One instance
+    chunks one document: the current heading carries over to later pages.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # A heading does not cut off a chunk shorter than this
+        self.min_chunk_size = chunk_size // 5
+        self.section: Optional[str] = None
+
+    # -------------------------------------------------------------- structure
+
+    def _blocks(self, text: str) -> Iterator[Tuple[str, int, int, Optional[str]]]:
+        """
+        Yield (kind, start, end, section) blocks: each heading or clause line
+        starts a new block, which runs until the next one.
+        """
+        kind, start, section = TEXT, 0, self.section
+        for match in _BOUNDARY_RE.finditer(text):
+            line_start = match.start()
+            if line_start > start:
+                yield kind, start, line_start, section
+
+            heading = match.group("heading")
+            if heading is None:
+                kind, start = CLAUSE, line_start
+                continue
+
+            # "Article 17" + "Right to erasure" on the next line
+            if _LABEL_ONLY_RE.fullmatch(heading):
+                title_end = text.find("\n", match.end() + 1)
+                title = text[match.end() + 1:title_end if title_end >= 0 else len(text)].strip()
+                if title and not _CLAUSE_RE.match(title) and not title.endswith((".", ";", ",")):
+                    heading = f"{heading} - {title}"
+            section = self.section = heading[:MAX_HEADING_CHARS]
+            kind, start = HEADING, line_start
+        if len(text) > start:
+            yield kind, start, len(text), section
+
+    def _units(self, text: str, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """
+        Sentence spans of text[start:end], trimmed of whitespace and at most
+        chunk_size long.
+        """
+        for match in _SENTENCE_RE.finditer(text, start, end):
+            piece_start = match.start()
+            piece_end = piece_start + len(match.group().rstrip())
+            # Over-long sentence: cut at the last whitespace that fits
+            while piece_end - piece_start > self.chunk_size:
+                cut = text.rfind(" ", piece_start + 1, piece_start + self.chunk_size)
+                if cut <= piece_start:
+                    cut = piece_start + self.chunk_size
+                yield piece_start, cut
+                piece_start = cut
+                while piece_start < piece_end and text[piece_start].isspace():
+                    piece_start += 1
+            if piece_end > piece_start:
+                yield piece_start, piece_end
+
+    # ----------------------------------------------------------------- chunks
+
+    def split_text(self, text: str) -> List[Tuple[int, int, Optional[str]]]:
+        """
+        Chunk one page; returns (start, end, section) spans of `text`.
+        """
+        spans: List[Tuple[int, int, Optional[str]]] = []
+        current: List[_Unit] = []
+
+        def emit(overlap: bool) -> List[_Unit]:
+            spans.append((current[0].start, current[-1].end, current[0].section))
+            if not overlap:
+                return []
+            tail: List[_Unit] = []
+            for unit in reversed(current[1:]):
+                if current[-1].end - unit.start > self.chunk_overlap:
+                    break
+                tail.insert(0, unit)
+            return tail
+
+        for kind, block_start, block_end, section in self._blocks(text):
+            length = current[-1].end - current[0].start if current else 0
+            if current and length >= self.min_chunk_size:
+                if kind == HEADING or (kind == CLAUSE and length + block_end - block_start > self.chunk_size):
+                    current = emit(overlap=False)
+
+            for start, end in self._units(text, block_start, block_end):
+                if current and end - current[0].start > self.chunk_size:
+                    current = emit(overlap=True)
+                    while current and end - current[0].start > self.chunk_size:
+                        current.pop(0)
+                current.append(_Unit(start, end, section))
+
+        if current:
+            emit(overlap=False)
+        return spans
+
+    def split_page(self, doc_name: str, page_number: int, text: str) -> List[Document]:
+        chunks = []
+        for start, end, section in self.split_text(text):
+            metadata = {
+                "doc_name": doc_name,
+                "page_number": page_number,
+                "start_index": start,
+                "end_index": end
+            }
+            if section:
+                # Pinecone metadata cannot hold nulls: omit rather than None
+                metadata["section"] = section
+            chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
@@ -0,0 +1,169 @@
+# backend/app/rag/embedding_cache.py
+
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form used as the cache key, so that
+    "What is the retention period?" and "what is the  retention period"
+    share one entry.
+    """
+    text = _WHITESPACE.sub(" ", query.casefold()).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+class _DiskEmbeddingStore:
+    """
+    Small SQLite spill store so cached query embeddings survive restarts.
+    Trimmed to `max_size` rows, oldest first.
+    """
+
+    def __init__(self, path: str, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM query_embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        vector, created_at = row
+        if self.ttl_seconds > 0 and time.time() - created_at > self.ttl_seconds:
+            return None
+        return np.frombuffer(vector, dtype=np.float32).tolist()
+
+    def set_many(self, items: Iterable[Tuple[str, List[float]]]):
+        now = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.execute(
+                "DELETE FROM query_embeddings WHERE key NOT IN ("
+                " SELECT key FROM query_embeddings ORDER BY created_at DESC LIMIT ?)",
+                (self.max_size,)
+            )
+            self._conn.commit()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU + TTL cache for query embeddings, keyed by
+    (model name, normalized query text).
+
+    Lookups go memory first, then the optional on-disk store;
+    disk hits are promoted back into memory. The async methods only touch
+    memory inline: disk reads and writes run in a worker thread, off the
+    event loop.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        disk_path: Optional[str] = None
+    ):
+        self._memory = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._disk = _DiskEmbeddingStore(disk_path, max_size, ttl_seconds) if disk_path else None
+        self.disk_hits = 0
+
+    @staticmethod
+    def key(model_name: str, query: str) -> str:
+        return f"{model_name}\x00{normalize_query(query)}"
+
+    def get(self, model_name: str, query: str) -> Optional[List[float]]:
+        key = self.key(model_name, query)
+        vector = self._memory.get(key)
+        if vector is None and self._disk is not None:
+            vector = self._disk_get([key])[0]
+        return vector
+
+    def set(self, model_name: str, query: str, vector: List[float]):
+        key = self.key(model_name, query)
+        self._memory.set(key, vector)
+        if self._disk is not None:
+            self._disk_set([(key, vector)])
+
+    async def aget_many(self, model_name: str, queries: List[str]) -> List[Optional[List[float]]]:
+        keys = [self.key(model_name, query) for query in queries]
+        vectors = [self._memory.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing and self._disk is not None:
+            found = await asyncio.to_thread(self._disk_get, [keys[i] for i in missing])
+            for i, vector in zip(missing, found):
+                vectors[i] = vector
+        return vectors
+
+    async def aget(self, model_name: str, query: str) -> Optional[List[float]]:
+        return (await self.aget_many(model_name, [query]))[0]
+
+    async def aset_many(self, model_name: str, vectors: Dict[str, List[float]]):
+        items = [(self.key(model_name, query), vector) for query, vector in vectors.items()]
+        for key, vector in items:
+            self._memory.set(key, vector)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk_set, items)
+
+    async def aset(self, model_name: str, query: str, vector: List[float]):
+        await self.aset_many(model_name, {query: vector})
+
+    def _disk_get(self, keys: List[str]) -> List[Optional[List[float]]]:
+        vectors = []
+        for key in keys:
+            vector = self._disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._memory.set(key, vector)
+            vectors.append(vector)
+        return vectors
+
+    def _disk_set(self, items: List[Tuple[str, List[float]]]):
+        try:
+            self._disk.set_many(items)
+        except sqlite3.Error as e:
+            # The disk tier is best effort; memory caching still works.
+            print(f"⚠️ Query embedding cache write failed: {e}")
+
+    def stats(self) -> Dict:
+        stats = self._memory.stats()
+        # A disk hit is first counted as a memory miss; report it as a hit overall.
+        stats["disk_hits"] = self.disk_hits
+        stats["misses"] -= self.disk_hits
+        stats["hits"] += self.disk_hits
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) if lookups else 0.0
+        return stats
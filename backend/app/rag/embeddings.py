@@ -1,66 +1,182 @@
-from typing import List
-from huggingface_hub import InferenceClient
+from typing import List, Optional
+from app.core import metrics
 from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.rag.embedding_cache import QueryEmbeddingCache
+from app.rag.query_batcher import QueryEmbeddingBatcher
+import asyncio
 import time
-import requests
+
+huggingface_hub = lazy_import("huggingface_hub")
 
 class EmbeddingModel:
     """
     Centralized embedding model for the entire RAG system.
     Uses huggingface_hub InferenceClient for robust API handling.
+
+    The async path uses one AsyncInferenceClient per process, which keeps a
+    single pooled keep-alive HTTP session for every request.
     """
 
     def __init__(self):
         self.model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        
+
         if not settings.HUGGINGFACEHUB_API_TOKEN:
             print("⚠️ WARNING: HUGGINGFACEHUB_API_TOKEN not set. Embeddings will fail.")
             self.client = None
         else:
-            self.client = InferenceClient(token=settings.HUGGINGFACEHUB_API_TOKEN)
+            self.client = huggingface_hub.InferenceClient(token=settings.HUGGINGFACEHUB_API_TOKEN)
+
+        # Created lazily: it must be bound to the running event loop.
+        self._async_client: Optional["huggingface_hub.AsyncInferenceClient"] = None
+
+        # Users repeat the same compliance questions; skip the remote call for those.
+        self.query_cache = QueryEmbeddingCache(
+            max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+            disk_path=settings.QUERY_EMBEDDING_CACHE_PATH or None
+        )
+
+        # Concurrent async questions share one feature_extraction request
+        self.query_batcher = QueryEmbeddingBatcher(
+            self._agenerate,
+            window_ms=settings.QUERY_EMBED_BATCH_WINDOW_MS,
+            max_batch_size=settings.QUERY_EMBED_MAX_BATCH_SIZE
+        )
 
-    def _generate(self, texts: List[str]) -> List[List[float]]:
+    @property
+    def async_client(self) -> Optional["huggingface_hub.AsyncInferenceClient"]:
+        if self._async_client is None and settings.HUGGINGFACEHUB_API_TOKEN:
+            self._async_client = huggingface_hub.AsyncInferenceClient(token=settings.HUGGINGFACEHUB_API_TOKEN)
+        return self._async_client
+
+    @staticmethod
+    def _to_list(response) -> List[List[float]]:
+        # feature_extraction returns ndarray or list depending on usage
+        # We force it to list for consistency
+        import numpy as np
+        if isinstance(response, np.ndarray):
+            return response.tolist()
+        return response
+
+    @staticmethod
+    def _retry_delay(attempt: int, error: Exception) -> float:
+        delay = settings.EMBED_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+        # 503 "Model is loading" needs a longer warm-up than transient errors
+        if "503" in str(error) or "Model is loading" in str(error):
+            delay = max(delay, 3)
+        return delay
+
+    def _generate(self, texts: List[str], max_attempts: Optional[int] = None) -> List[List[float]]:
+        """
+        Call feature_extraction, retrying with exponential backoff
+        (EMBED_RETRY_BACKOFF_SECONDS, doubled per attempt).
+        """
         if not self.client:
              raise ValueError("HuggingFace Token is missing.")
 
-        for attempt in range(3):
+        # The first attempt plus EMBED_MAX_RETRIES retries
+        max_attempts = max_attempts or settings.EMBED_MAX_RETRIES + 1
+
+        for attempt in range(max_attempts):
             try:
-                # feature_extraction returns ndarray or list depending on usage
-                # We force it to list for consistency
-                response = self.client.feature_extraction(texts, model=self.model_name)
                 # Parse response: it behaves differently for single vs list
                 # But widely it returns a list of embeddings
-                import numpy as np
-                if isinstance(response, np.ndarray):
-                    return response.tolist()
-                return response
+                response = self.client.feature_extraction(texts, model=self.model_name)
+                return self._to_list(response)
+            except Exception as e:
+                print(f"InferenceClient Error (Attempt {attempt+1}/{max_attempts}): {e}")
+
+                if attempt == max_attempts - 1:
+                    raise ValueError(f"HF Inference Failed: {e}")
+                metrics.EMBED_RETRIES.inc(mode="sync")
+                time.sleep(self._retry_delay(attempt, e))
+
+        return []
+
+    async def _agenerate(self, texts: List[str], max_attempts: Optional[int] = None) -> List[List[float]]:
+        """
+        Async counterpart of _generate; backoff waits do not block the event loop.
+        """
+        if not self.async_client:
+             raise ValueError("HuggingFace Token is missing.")
+
+        # The first attempt plus EMBED_MAX_RETRIES retries
+        max_attempts = max_attempts or settings.EMBED_MAX_RETRIES + 1
+
+        for attempt in range(max_attempts):
+            try:
+                response = await self.async_client.feature_extraction(texts, model=self.model_name)
+                return self._to_list(response)
             except Exception as e:
-                print(f"InferenceClient Error (Attempt {attempt+1}): {e}")
-                
-                # Check for 503 loading
-                if "503" in str(e) or "Model is loading" in str(e):
-                    time.sleep(3)
-                    continue
-                
-                if attempt == 2:
+                print(f"AsyncInferenceClient Error (Attempt {attempt+1}/{max_attempts}): {e}")
+
+                if attempt == max_attempts - 1:
                     raise ValueError(f"HF Inference Failed: {e}")
-                time.sleep(1)
-        
+                metrics.EMBED_RETRIES.inc(mode="async")
+                await asyncio.sleep(self._retry_delay(attempt, e))
+
         return []
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         return self._generate(texts)
 
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._agenerate(texts)
+
     def embed_query(self, query: str) -> List[float]:
+        cached = self.query_cache.get(self.model_name, query)
+        if cached is not None:
+            return cached
+
         # Returns a single vector
         # Note: feature_extraction on a list of 1 string usually returns [ [float...] ]
         # feature_extraction on a raw string returns [float...] or [ [float...] ] depending on version
         # Safest is to pass a list
         result = self._generate([query])
         if result and len(result) > 0:
+            self.query_cache.set(self.model_name, query, result[0])
             return result[0]
         return []
 
+    async def aembed_query(self, query: str) -> List[float]:
+        cached = await self.query_cache.aget(self.model_name, query)
+        if cached is not None:
+            return cached
+
+        if settings.QUERY_EMBED_BATCH_WINDOW_MS > 0:
+            vector = await self.query_batcher.embed(query)
+            await self.query_cache.aset(self.model_name, query, vector)
+            return vector
+
+        result = await self._agenerate([query])
+        if result and len(result) > 0:
+            await self.query_cache.aset(self.model_name, query, result[0])
+            return result[0]
+        return []
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        """
+        Embed many questions with one remote call; cached ones are not resent.
+        """
+        vectors = await self.query_cache.aget_many(self.model_name, queries)
+        missing = list(dict.fromkeys(q for q, vector in zip(queries, vectors) if vector is None))
+
+        if missing:
+            result = await self._agenerate(missing)
+            if len(result) != len(missing):
+                raise ValueError(f"Expected {len(missing)} embeddings, got {len(result)}")
+            fresh = dict(zip(missing, result))
+            await self.query_cache.aset_many(self.model_name, fresh)
+            vectors = [vector if vector is not None else fresh[q] for q, vector in zip(queries, vectors)]
+
+        return vectors
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
     @property
     def embedder(self):
         return self
@@ -73,3 +189,16 @@ def get_embedding_model() -> EmbeddingModel:
     if _embedding_model is None:
         _embedding_model = EmbeddingModel()
     return _embedding_model
+
+def _query_cache_stats():
+    # Not created until the first embedding call
+    return _embedding_model.query_cache.stats() if _embedding_model is not None else None
+
+metrics.register_cache("query_embedding", _query_cache_stats)
+
+async def aclose_embedding_model():
+    """
+    Close the shared model's async client, if the model was ever created.
+    """
+    if _embedding_model is not None:
+        await _embedding_model.aclose()
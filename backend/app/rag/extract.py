@@ -0,0 +1,118 @@
+# backend/app/rag/extract.py
+
+import mmap
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from app.core import patch
+from app.core.config import settings
+
+# Per-process reader cache, so a worker parses a PDF's xref table once
+# per file instead of once per page range.
+_worker_reader: Optional[Tuple[str, float, PdfReader]] = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def open_pdf(path: str) -> PdfReader:
+    """
+    Open a PDF from disk through a read-only memory map.
+
+    PdfReader(path) copies the whole file into a BytesIO; with a map, pages
+    are read from the OS page cache on demand (and shared between processes).
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file: cannot be mapped; let pypdf report it
+            return PdfReader(path)
+    return PdfReader(data)
+
+
+def _reader_for(path: str) -> PdfReader:
+    global _worker_reader
+    mtime = os.path.getmtime(path)
+    if _worker_reader is None or _worker_reader[:2] != (path, mtime):
+        _worker_reader = (path, mtime, open_pdf(path))
+    return _worker_reader[2]
+
+
+def _extract_range(path: str, start: int, end: int) -> List[str]:
+    """
+    Extract pages [start, end) of the PDF at `path`. Runs in a worker process.
+    """
+    reader = _reader_for(path)
+    return [(reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Shared process pool, created on first use. None when parallel
+    extraction is disabled or the host has no working semaphores
+    (serverless: SemLock is monkeypatched, see app/core/patch.py).
+    """
+    global _pool
+    if settings.PDF_EXTRACT_WORKERS <= 1 or patch.SEMLOCK_PATCHED:
+        return None
+
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a multi-threaded server process is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return _pool
+
+
+def count_pages(path: str) -> int:
+    return len(open_pdf(path).pages)
+
+
+def iter_pdf_pages(path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page of the PDF at `path`, in order.
+    Page numbers are 1-based, matching what users see in a PDF viewer.
+
+    Pages are extracted in ranges of PDF_EXTRACT_PAGES_PER_TASK across a
+    process pool. Only a bounded window of ranges is in flight at a time, so
+    peak memory does not grow with the page count.
+    """
+    page_count = count_pages(path)
+    pages_per_task = max(1, settings.PDF_EXTRACT_PAGES_PER_TASK)
+    pool = _get_pool() if page_count > pages_per_task else None
+
+    if pool is None:
+        reader = open_pdf(path)
+        for i, page in enumerate(reader.pages):
+            yield i + 1, page.extract_text() or ""
+        return
+
+    window = settings.PDF_EXTRACT_WORKERS * 2
+    ranges = deque(
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    )
+    in_flight = deque()
+
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < window:
+                start, end = ranges.popleft()
+                in_flight.append((start, pool.submit(_extract_range, path, start, end)))
+
+            start, future = in_flight.popleft()
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text
+    finally:
+        # Consumer stopped early (or failed): do not leave work queued
+        for _, future in in_flight:
+            future.cancel()
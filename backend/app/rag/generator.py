@@ -1,18 +1,37 @@
 # backend/app/rag/generator.py
 
-from groq import Groq
+from typing import AsyncIterator
+
+from app.core import metrics
 from app.core.config import settings
+from app.core.lazy import lazy_import
+
+groq = lazy_import("groq")
+
+# generate() reports failures as text; these prefixes mark such answers.
+ERROR_PREFIXES = ("Configuration Error:", "Error contacting LLM Provider:")
+
+
+class LLMError(Exception):
+    """
+    The LLM failed while streaming. Its message is the text generate()
+    would have returned.
+    """
+
 
 class LLMGenerator:
     """
     LLM Generator using Groq + LLaMA 3 (8B).
     
     Refactored for Lazy Initialization to prevent Vercel startup crashes if keys are missing.
+    The sync and async clients are each created once and keep pooled
+    keep-alive connections to Groq.
     """
 
     def __init__(self):
         self.model_name = "llama-3.1-8b-instant"
         self._client = None
+        self._async_client = None
 
     @property
     def client(self):
@@ -21,9 +40,44 @@ class LLMGenerator:
                 # We do NOT raise here, because this might be accessed at startup.
                 # We return None and handle it in generate()
                 return None
-            self._client = Groq(api_key=settings.GROQ_API_KEY)
+            self._client = groq.Groq(api_key=settings.GROQ_API_KEY)
         return self._client
 
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            if not settings.GROQ_API_KEY:
+                return None
+            self._async_client = groq.AsyncGroq(api_key=settings.GROQ_API_KEY)
+        return self._async_client
+
+    def _request(self, prompt: str, stream: bool = False) -> dict:
+        return {
+            "model": self.model_name,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.1,
+            "max_tokens": 512,
+            "stream": stream
+        }
+
+    @staticmethod
+    def is_error(answer: str) -> bool:
+        return answer.startswith(ERROR_PREFIXES)
+
+    @staticmethod
+    def _parse(response) -> str:
+        answer = response.choices[0].message.content.strip()
+
+        if not answer:
+            return "Answer not found in the provided documents."
+
+        return answer
+
     def generate(self, prompt: str) -> str:
         """
         Generate an answer from the LLM using a grounded prompt.
@@ -32,24 +86,52 @@ class LLMGenerator:
             return "Configuration Error: GROQ_API_KEY is unset. Please add it to Vercel Environment Variables."
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=512
-            )
-            answer = response.choices[0].message.content.strip()
-            
-            if not answer:
-                return "Answer not found in the provided documents."
-
-            return answer
+            response = self.client.chat.completions.create(**self._request(prompt))
+            return self._parse(response)
 
         except Exception as e:
             print(f"LLM Generation Error: {e}")
+            metrics.LLM_ERRORS.inc(mode="sync")
             return f"Error contacting LLM Provider: {str(e)}"
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Async variant of generate(); the request does not hold a worker thread.
+        """
+        if not self.async_client:
+            return "Configuration Error: GROQ_API_KEY is unset. Please add it to Vercel Environment Variables."
+
+        try:
+            response = await self.async_client.chat.completions.create(**self._request(prompt))
+            return self._parse(response)
+
+        except Exception as e:
+            print(f"LLM Generation Error: {e}")
+            metrics.LLM_ERRORS.inc(mode="async")
+            return f"Error contacting LLM Provider: {str(e)}"
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Stream answer tokens as Groq produces them.
+        Raises LLMError on failure, possibly after some tokens were yielded:
+        the caller must not mistake the partial text for an answer.
+        """
+        if not self.async_client:
+            raise LLMError("Configuration Error: GROQ_API_KEY is unset. Please add it to Vercel Environment Variables.")
+
+        try:
+            stream = await self.async_client.chat.completions.create(**self._request(prompt, stream=True))
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+
+        except Exception as e:
+            print(f"LLM Streaming Error: {e}")
+            metrics.LLM_ERRORS.inc(mode="stream")
+            raise LLMError(f"Error contacting LLM Provider: {str(e)}") from e
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
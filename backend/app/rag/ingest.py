@@ -1,67 +1,261 @@
 # backend/app/rag/ingest.py
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_pinecone import PineconeVectorStore
+from app.rag.bm25 import get_bm25_index
+from app.rag.chunk_store import get_chunk_store
+from app.rag.chunker import StructureChunker
 from app.rag.embeddings import get_embedding_model
+from app.rag.registry import content_hash, get_chunk_registry
+from app.rag.vectorstore import fetch_embeddings, get_vector_store, upsert_embeddings
+from app.core import metrics
 from app.core.config import settings
-from pinecone import Pinecone, ServerlessSpec
-import time
 
-def process_and_index_document(text_content: str, filename: str):
+class IngestProgress:
     """
-    Takes raw text from a PDF (extracted in service layer) 
-    and indexes it into Pinecone.
+    Counters advanced by the ingestion pipeline, read by job status polling.
+    Each counter is only written from one thread.
     """
-    
-    # 1. Create Document Object
-    doc = Document(
-        page_content=text_content,
-        metadata={"doc_name": filename}
-    )
 
-    # 2. Chunking
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    chunks = splitter.split_documents([doc])
+    def __init__(self):
+        self.pages_extracted = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+        self.chunks_skipped = 0
+        self.chunks_reused = 0
+
 
-    # 3. Add Chunk Metadata
-    for idx, chunk in enumerate(chunks):
-        chunk.metadata["chunk_id"] = f"{filename}_c{idx}"
-        chunk.metadata["text"] = chunk.page_content # Explicitly store text for retrieval if needed
+def _chunk_hash(chunk: Document) -> str:
+    # The page is part of the key: an unchanged passage that moved to another
+    # page must be re-indexed, or its citation would point at the old page.
+    return content_hash(f"{chunk.metadata.get('page_number')}\x00{chunk.page_content}")
 
-    print(f"Split {filename} into {len(chunks)} chunks.")
 
-    # 4. Index to Pinecone
-    index_chunks(chunks)
+def new_splitter() -> StructureChunker:
+    # One per document: it tracks the current section heading across pages
+    return StructureChunker(chunk_size=1000, chunk_overlap=200)
 
-    return len(chunks)
 
-def index_chunks(chunks):
+def chunk_page(
+    splitter: StructureChunker,
+    filename: str,
+    page_number: int,
+    page_text: str
+) -> List[Document]:
+    """
+    Split one extracted page; every chunk carries its document, page,
+    character offsets (start_index, end_index) and section heading.
+    Page offsets let retrieval merge overlapping chunks.
     """
-    Stores validated chunks into Pinecone.
+    return splitter.split_page(filename, page_number, page_text)
+
+
+def process_and_index_document(
+    pages: Iterable[Tuple[int, str]],
+    filename: str,
+    document_id: str,
+    progress: Optional[IngestProgress] = None
+) -> int:
     """
-    if not settings.PINECONE_API_KEY:
-        raise ValueError("PINECONE_API_KEY is missing via env vars")
+    Takes extracted PDF pages as (page_number, text) pairs
+    (see app.rag.extract.iter_pdf_pages) and indexes them into the vector store.
+
+    Every chunk carries the stable `document_id` (metadata "doc_id"), which
+    workspaces are scoped by; the filename is kept for citations only, so
+    two uploads with the same name never share or replace each other's chunks.
+
+    Pages are chunked one at a time, so every chunk carries the page it came
+    from, and chunks are indexed in groups of INGEST_FLUSH_CHUNKS while later
+    pages are still being extracted.
+
+    Chunks are content-addressed (see app.rag.registry): a chunk already
+    indexed for this document is neither embedded nor upserted again (e.g.
+    when an interrupted job is re-run), and chunks that are no longer
+    present are deleted from the index. A chunk unchanged from the previous
+    revision (the last document indexed under the same filename) is upserted
+    with that revision's vector, so a revision only embeds what changed.
+    The BM25 keyword index (app.rag.bm25) and the chunk text store
+    (app.rag.chunk_store) are kept in step with the vector store.
+    """
+    splitter = new_splitter()
+
+    progress = progress or IngestProgress()
+    registry = get_chunk_registry()
+    indexed = registry.get_chunk_ids(document_id)
+    previous_id = registry.get_previous_revision(filename, document_id)
+    previous = registry.get_chunk_ids(previous_id) if previous_id else {}
+    seen: Set[str] = set()
+    pending: List[Document] = []
+    reused: List[Tuple[Document, str]] = []
+
+    # Extraction is lazy: time spent waiting for each page is the extract stage
+    for page_number, page_text in metrics.timed_iter(pages, "extract"):
+        progress.pages_extracted += 1
 
+        # 1-2. Chunking, one page at a time
+        with metrics.span("chunking", pipeline="ingest"):
+            chunks = chunk_page(splitter, filename, page_number, page_text)
+
+        for chunk in chunks:
+            chunk_hash = _chunk_hash(chunk)
+            if chunk_hash in seen or chunk_hash in indexed:
+                progress.chunks_skipped += 1
+                metrics.INGEST_CHUNKS.inc(result="skipped")
+                seen.add(chunk_hash)
+                continue
+            seen.add(chunk_hash)
+
+            # 3. Add Chunk Metadata (content-addressed ID: stable across revisions)
+            # (the text itself goes to the chunk store, not into the vector index)
+            chunk.metadata["doc_id"] = document_id
+            chunk.metadata["chunk_id"] = f"{document_id}_{chunk_hash[:16]}"
+            if chunk_hash in previous:
+                reused.append((chunk, previous[chunk_hash]))
+            else:
+                pending.append(chunk)
+
+        # 4. Index to vector store
+        if len(pending) + len(reused) >= settings.INGEST_FLUSH_CHUNKS:
+            pending.extend(reuse_chunks(reused, progress))
+            index_chunks(pending, progress)
+            pending, reused = [], []
+
+    pending.extend(reuse_chunks(reused, progress))
+    if pending:
+        index_chunks(pending, progress)
+
+    # 5. Drop chunks of a previous revision that are no longer present
+    stale_ids = registry.remove_chunks(document_id, set(indexed) - seen)
+    if stale_ids:
+        get_vector_store().delete(ids=stale_ids)
+        get_bm25_index().delete(stale_ids)
+        get_chunk_store().delete(stale_ids)
+
+    print(f"Split {filename} into {len(seen)} chunks "
+          f"({progress.chunks_skipped} already indexed, {progress.chunks_reused} reused from "
+          f"{previous_id or 'no previous revision'}, {len(stale_ids)} stale removed).")
+
+    return len(seen)
+
+def _embed_batch(embedding_model, batch: List[Document]) -> List[List[float]]:
+    with metrics.span("embedding", pipeline="ingest"):
+        vectors = embedding_model.embed_documents([chunk.page_content for chunk in batch])
+    if len(vectors) != len(batch):
+        raise ValueError(f"Expected {len(batch)} embeddings, got {len(vectors)}")
+    return vectors
+
+
+def _upsert_batch(
+    vectorstore,
+    batch: List[Document],
+    vectors: List[List[float]]
+) -> int:
+    with metrics.span("upsert", pipeline="ingest"):
+        # Text first: a vector must never be searchable without its text
+        get_chunk_store().put((chunk.metadata["chunk_id"], chunk.page_content) for chunk in batch)
+        upsert_embeddings(
+            vectorstore,
+            embeddings=vectors,
+            metadatas=[chunk.metadata for chunk in batch],
+            ids=[chunk.metadata["chunk_id"] for chunk in batch]
+        )
+        get_bm25_index().add(batch)
+    metrics.INGEST_CHUNKS.inc(len(batch), result="upserted")
+
+    # Recorded only after the upsert succeeded, so a failed job re-indexes them
+    by_doc: Dict[str, List[Tuple[str, str]]] = {}
+    for chunk in batch:
+        by_doc.setdefault(chunk.metadata["doc_id"], []).append(
+            (_chunk_hash(chunk), chunk.metadata["chunk_id"])
+        )
+    registry = get_chunk_registry()
+    for document_id, entries in by_doc.items():
+        registry.add_chunks(document_id, entries)
+    return len(batch)
+
+
+def reuse_chunks(chunks: List[Tuple[Document, str]], progress: Optional[IngestProgress] = None) -> List[Document]:
+    """
+    Upsert (chunk, source chunk_id) pairs with the vector already stored for
+    the source chunk, skipping the embedding call. Returns the chunks whose
+    source vector is gone; they still need embedding.
+    """
+    if not chunks:
+        return []
+    progress = progress or IngestProgress()
+    vectorstore = get_vector_store()
+
+    with metrics.span("reuse", pipeline="ingest"):
+        vectors = fetch_embeddings(vectorstore, [source for _, source in chunks])
+    found = [(chunk, vectors[source]) for chunk, source in chunks if source in vectors]
+    missing = [chunk for chunk, source in chunks if source not in vectors]
+
+    if found:
+        progress.chunks_upserted += _upsert_batch(
+            vectorstore, [chunk for chunk, _ in found], [vector for _, vector in found]
+        )
+        progress.chunks_reused += len(found)
+        metrics.INGEST_CHUNKS.inc(len(found), result="reused")
+    return missing
+
+
+def index_chunks(chunks: List[Document], progress: Optional[IngestProgress] = None):
+    """
+    Stores validated chunks into the configured vector store
+    (Pinecone or the in-process local index, see VECTOR_STORE_BACKEND).
+
+    Chunks are embedded in batches of EMBED_BATCH_SIZE, with at most
+    EMBED_MAX_CONCURRENCY batches in flight; a failed batch is retried on its
+    own (see EmbeddingModel._generate). Embedded batches are upserted in
+    parallel on UPSERT_MAX_CONCURRENCY workers while later batches are still
+    being embedded. When all upsert workers are busy, embedding waits
+    (backpressure), so finished vectors never pile up in memory.
+    """
+    progress = progress or IngestProgress()
+
+    # Serverless Optimization: Assume the Pinecone index exists to avoid timeouts.
+    vectorstore = get_vector_store()
     embedding_model = get_embedding_model()
 
-    # Initialize Pinecone
-    pc = Pinecone(api_key=settings.PINECONE_API_KEY)
-    
-    index_name = settings.PINECONE_INDEX_NAME
+    batch_size = max(1, settings.EMBED_BATCH_SIZE)
+    concurrency = max(1, settings.EMBED_MAX_CONCURRENCY)
+    upsert_concurrency = max(1, settings.UPSERT_MAX_CONCURRENCY)
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
 
-    # Store
-    # Serverless Optimization: Assume index exists to avoid timeouts.
     try:
-        vectorstore = PineconeVectorStore.from_documents(
-            documents=chunks,
-            embedding=embedding_model.embedder,
-            index_name=index_name
-        )
-        print(f"✅ Stored {len(chunks)} chunks in Pinecone index: {index_name}")
+        with ThreadPoolExecutor(max_workers=concurrency) as embed_pool, \
+                ThreadPoolExecutor(max_workers=upsert_concurrency) as upsert_pool:
+            # Only `concurrency` embeddings and `upsert_concurrency` upserts are
+            # outstanding at a time.
+            pending = deque()
+            upserts = deque()
+            next_batch = 0
+
+            while next_batch < len(batches) or pending:
+                while next_batch < len(batches) and len(pending) < concurrency:
+                    batch = batches[next_batch]
+                    pending.append((batch, embed_pool.submit(_embed_batch, embedding_model, batch)))
+                    next_batch += 1
+
+                # Upsert in submission order, as each embedding completes
+                batch, future = pending.popleft()
+                vectors = future.result()
+                progress.chunks_embedded += len(batch)
+                metrics.INGEST_CHUNKS.inc(len(batch), result="embedded")
+
+                # Backpressure: wait for the oldest upsert when all workers are busy
+                while upserts and (len(upserts) >= upsert_concurrency or upserts[0].done()):
+                    progress.chunks_upserted += upserts.popleft().result()
+                upserts.append(upsert_pool.submit(_upsert_batch, vectorstore, batch, vectors))
+
+            while upserts:
+                progress.chunks_upserted += upserts.popleft().result()
+
+        print(f"✅ Stored {len(chunks)} chunks in {settings.VECTOR_STORE_BACKEND} vector store "
+              f"({len(batches)} batches)")
     except Exception as e:
-        print(f"❌ Failed to store in Pinecone: {e}")
+        print(f"❌ Failed to store in vector store: {e}")
         raise e
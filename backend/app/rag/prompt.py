@@ -1,8 +1,20 @@
 # backend/app/rag/prompt.py
 
-from typing import List
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 
+from app.core import metrics
+from app.core.config import settings
+
+# Words/numbers and single punctuation marks; long words count as several tokens
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;:])\s+|\n\s*\n")
+
+# A truncated chunk shorter than this is not worth including
+MIN_PARTIAL_TOKENS = 32
+
 
 SYSTEM_RULES = """
 You are a compliance policy assistant.
@@ -18,42 +30,148 @@ Answer not found in the provided documents.
 """.strip()
 
 
-def build_prompt(question: str, documents: List[Document]) -> str:
-    """
-    Build a strictly grounded prompt for RAG-based generation.
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
 
-    Args:
-        question (str): User question
-        documents (List[Document]): Retrieved documents (LangChain Document objects)
 
-    Returns:
-        str: Final prompt string
+def count_tokens(text: str) -> int:
     """
+    Approximate LLM token count.
+
+    The default heuristic (about one token per 4 characters of a word, one per
+    punctuation mark) needs no vocabulary download. PROMPT_TOKENIZER=tiktoken
+    uses the optional tiktoken package for exact BPE counts instead.
+    """
+    if settings.PROMPT_TOKENIZER == "tiktoken":
+        return len(_tiktoken_encoding().encode(text))
+    return sum((len(token) + 3) // 4 for token in _TOKEN_RE.findall(text))
 
-    if not documents:
-        # No context at all → force refusal
-        return f"""{SYSTEM_RULES}
 
+def _truncate_to_sentences(text: str, max_tokens: int) -> str:
+    """
+    Longest prefix of whole sentences that fits in `max_tokens`.
+    """
+    cut = 0
+    used = 0
+    for boundary in _SENTENCE_END_RE.finditer(text):
+        used += count_tokens(text[cut:boundary.start()])
+        if used > max_tokens:
+            break
+        cut = boundary.start()
+    else:
+        if used + count_tokens(text[cut:]) <= max_tokens:
+            cut = len(text)
+    return text[:cut].strip()
+
+
+def _render(question: str, context_text: str, history_text: str = "") -> str:
+    if history_text:
+        history_text = f"""
+Conversation so far (use it only to understand the question; answer from the context):
+{history_text}
+"""
+    return f"""{SYSTEM_RULES}
+{history_text}
 Context:
-(No relevant context provided)
+{context_text}
 
 Question:
 {question}
 """
 
-    context_blocks = []
+
+def condense_history(turns: List[Tuple[str, str]], max_tokens: int) -> str:
+    """
+    Earlier (question, answer) turns that fit in `max_tokens`, newest first.
+    A long answer is cut at a sentence boundary; once a turn does not fit,
+    it and everything older are dropped.
+    """
+    rendered: List[str] = []
+    remaining = max_tokens
+
+    for question, answer in reversed(turns):
+        asked = f"User: {question.strip()}"
+        cost = count_tokens(asked) + 3  # "Assistant:" and separators
+        if cost > remaining:
+            break
+        answer = answer.strip()
+        answer_tokens = count_tokens(answer)
+        if cost + answer_tokens > remaining:
+            if remaining - cost < MIN_PARTIAL_TOKENS:
+                break
+            answer = _truncate_to_sentences(answer, remaining - cost)
+            if not answer:
+                break
+            answer_tokens = count_tokens(answer)
+        rendered.append(f"{asked}\nAssistant: {answer}")
+        remaining -= cost + answer_tokens
+
+    return "\n\n".join(reversed(rendered))
+
+
+def pack_context(documents: List[Document], max_tokens: int) -> List[Document]:
+    """
+    Fill `max_tokens` with context in rank order. The first chunk that does
+    not fit is cut at a sentence boundary; everything after it is dropped.
+    """
+    included: List[Document] = []
+    remaining = max_tokens
+
     for doc in documents:
-        context_blocks.append(doc.page_content.strip())
+        text = doc.page_content.strip()
+        tokens = count_tokens(text) + 2  # block separator
+        if tokens <= remaining:
+            included.append(doc)
+            remaining -= tokens
+            continue
+
+        if remaining >= MIN_PARTIAL_TOKENS:
+            partial = _truncate_to_sentences(text, remaining - 2)
+            if partial:
+                included.append(Document(id=doc.id, page_content=partial, metadata=dict(doc.metadata)))
+        break
+
+    return included
+
+
+def build_prompt(
+    question: str,
+    documents: List[Document],
+    max_tokens: Optional[int] = None,
+    history: Optional[List[Tuple[str, str]]] = None
+) -> Tuple[str, List[Document]]:
+    """
+    Build a strictly grounded prompt for RAG-based generation.
 
-    context_text = "\n\n".join(context_blocks)
+    Args:
+        question (str): User question
+        documents (List[Document]): Retrieved documents, highest ranked first
+        max_tokens (int): Prompt token budget (defaults to PROMPT_TOKEN_BUDGET)
+        history: Earlier (question, answer) turns of the conversation, oldest
+            first; condensed into at most SESSION_HISTORY_TOKENS of the budget
 
-    prompt = f"""{SYSTEM_RULES}
+    Returns:
+        (prompt, included): the final prompt string and the documents (possibly
+        truncated) that made it into the context, for citations
+    """
+    if max_tokens is None:
+        max_tokens = settings.PROMPT_TOKEN_BUDGET
 
-Context:
-{context_text}
+    history_text = ""
+    if history:
+        history_text = condense_history(history, min(settings.SESSION_HISTORY_TOKENS, max_tokens // 2))
 
-Question:
-{question}
-"""
+    overhead = count_tokens(_render(question, "", history_text))
+    included = pack_context(documents, max_tokens - overhead)
+
+    if not included:
+        # No context at all → force refusal
+        prompt = _render(question, "(No relevant context provided)", history_text)
+    else:
+        context_text = "\n\n".join(doc.page_content.strip() for doc in included)
+        prompt = _render(question, context_text, history_text)
 
-    return prompt
+    metrics.PROMPT_TOKENS.observe(count_tokens(prompt))
+    return prompt, included
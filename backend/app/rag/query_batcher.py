@@ -0,0 +1,86 @@
+# backend/app/rag/query_batcher.py
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core import metrics
+
+
+class QueryEmbeddingBatcher:
+    """
+    Coalesces concurrent query embeddings into one remote call.
+
+    The first query starts a `window_ms` timer; every query submitted before
+    it fires (or until `max_batch_size` distinct texts are waiting) is sent
+    in the same request, and each caller gets its own vector back. Identical
+    texts in a batch are embedded once.
+
+    Bound to the event loop it is first used on; state left over from a
+    closed loop is discarded.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        window_ms: float = 5.0,
+        max_batch_size: int = 32
+    ):
+        self._embed = embed
+        self.window_seconds = max(0.0, window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references: the loop only keeps weak ones to running tasks
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._pending = {}
+            self._timer = None
+            self._in_flight = set()
+
+        future = loop.create_future()
+        self._pending.setdefault(text, []).append(future)
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+
+        task = self._loop.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: Dict[str, List[asyncio.Future]]):
+        texts = list(batch)
+        metrics.QUERY_EMBED_BATCH_SIZE.observe(len(texts))
+        try:
+            vectors = await self._embed(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for vector, futures in zip(vectors, batch.values()):
+            for future in futures:
+                # A caller that was cancelled meanwhile has a done future
+                if not future.done():
+                    future.set_result(vector)
@@ -0,0 +1,274 @@
+# backend/app/rag/registry.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+def content_hash(text: str) -> str:
+    """
+    Hash of a chunk's whitespace-normalized text.
+    Re-extraction of the same page may differ only in line breaks/spacing.
+    """
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def file_hasher():
+    """
+    Incremental form of file_hash, for content read in chunks.
+    """
+    return hashlib.sha256()
+
+
+def file_hash(content: bytes) -> str:
+    hasher = file_hasher()
+    hasher.update(content)
+    return hasher.hexdigest()
+
+
+class ChunkRegistry:
+    """
+    Content-addressed record of what is already in the vector index.
+
+    - documents: (file hash, filename) -> document ID of every fully indexed
+      upload, so an identical re-upload resolves to the already indexed
+      document before extraction.
+    - chunks: (document ID, content hash) -> chunk_id of every upserted chunk,
+      so re-running a document's ingestion only embeds and upserts what is
+      missing, and a new revision (a later upload under the same filename)
+      copies the vectors of its unchanged chunks instead of embedding them.
+
+    Rows are scoped to the vector index they describe (backend + index name),
+    so switching VECTOR_STORE_BACKEND never skips chunks the new index lacks.
+
+    Chunks indexed before they carried a document ID were recorded by
+    filename; the migration keeps them in legacy_chunks until
+    DocumentService.backfill_document_ids assigns them to their document.
+    """
+
+    def __init__(self, path: str, index_key: str):
+        self.index_key = index_key
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS indexed_documents (
+                index_key TEXT NOT NULL,
+                file_hash TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                document_id TEXT,
+                PRIMARY KEY (index_key, file_hash, filename)
+            );
+            """
+        )
+        migrating = self._migrate_documents()
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS indexed_chunks (
+                index_key TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (index_key, document_id, content_hash)
+            );
+            -- Chunks recorded by filename, before they carried a document ID
+            CREATE TABLE IF NOT EXISTS legacy_chunks (
+                index_key TEXT NOT NULL,
+                doc_name TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (index_key, doc_name, content_hash)
+            );
+            CREATE INDEX IF NOT EXISTS indexed_documents_filename
+                ON indexed_documents (index_key, filename, indexed_at);
+            """
+        )
+        if migrating:
+            self._migrate_chunks()
+        self._conn.commit()
+
+    def _migrate_documents(self) -> bool:
+        """
+        Registries written before chunks were scoped by document ID: documents
+        gain a document_id column (filled in by the backfill), and the old
+        chunks table (keyed by doc_name) is set aside for _migrate_chunks.
+        Returns whether there are chunks to migrate.
+        """
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(indexed_documents)")}
+        if "document_id" not in columns:
+            self._conn.execute("ALTER TABLE indexed_documents ADD COLUMN document_id TEXT")
+
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(indexed_chunks)")}
+        if not columns or "document_id" in columns:
+            return False
+        print("⚠️ Migrating the chunk registry to document IDs...")
+        self._conn.execute("ALTER TABLE indexed_chunks RENAME TO indexed_chunks_old")
+        return True
+
+    def _migrate_chunks(self):
+        # doc_name held the filename, or (briefly) the document ID. Uploads are
+        # PDFs, so a name without the extension is a document ID.
+        self._conn.executescript(
+            """
+            INSERT INTO indexed_chunks
+                SELECT * FROM indexed_chunks_old
+                WHERE doc_name IN (SELECT document_id FROM indexed_documents WHERE document_id IS NOT NULL)
+                   OR doc_name NOT LIKE '%.pdf';
+            INSERT INTO legacy_chunks
+                SELECT * FROM indexed_chunks_old
+                WHERE doc_name NOT IN (SELECT document_id FROM indexed_documents WHERE document_id IS NOT NULL)
+                  AND doc_name LIKE '%.pdf';
+            DROP TABLE indexed_chunks_old;
+            """
+        )
+
+    # ------------------------------------------------------------- documents
+
+    def get_document(self, file_hash: str, filename: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count, chunk_count, document_id FROM indexed_documents"
+                " WHERE index_key = ? AND file_hash = ? AND filename = ? AND document_id IS NOT NULL",
+                (self.index_key, file_hash, filename)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"page_count": row[0], "chunk_count": row[1], "document_id": row[2]}
+
+    def add_document(self, file_hash: str, filename: str, document_id: str, page_count: int, chunk_count: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO indexed_documents"
+                " (index_key, file_hash, filename, page_count, chunk_count, indexed_at, document_id)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.index_key, file_hash, filename, page_count, chunk_count, time.time(), document_id)
+            )
+            self._conn.commit()
+
+    def get_previous_revision(self, filename: str, document_id: str) -> Optional[str]:
+        """
+        ID of the most recently indexed other document uploaded as `filename`,
+        whose chunks a new revision can reuse.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT document_id FROM indexed_documents"
+                " WHERE index_key = ? AND filename = ? AND document_id IS NOT NULL AND document_id != ?"
+                " ORDER BY indexed_at DESC LIMIT 1",
+                (self.index_key, filename, document_id)
+            ).fetchone()
+        return row[0] if row else None
+
+    # ---------------------------------------------------------------- chunks
+
+    def get_chunk_ids(self, document_id: str) -> Dict[str, str]:
+        """
+        content hash -> chunk_id for everything indexed under `document_id`.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT content_hash, chunk_id FROM indexed_chunks WHERE index_key = ? AND document_id = ?",
+                (self.index_key, document_id)
+            ).fetchall()
+        return dict(rows)
+
+    def add_chunks(self, document_id: str, chunks: Iterable[Tuple[str, str]]):
+        """
+        Record (content hash, chunk_id) pairs once they are upserted.
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO indexed_chunks VALUES (?, ?, ?, ?)",
+                [(self.index_key, document_id, hash_, chunk_id) for hash_, chunk_id in chunks]
+            )
+            self._conn.commit()
+
+    def remove_chunks(self, document_id: str, hashes: Set[str]) -> List[str]:
+        """
+        Forget the given chunks; returns their chunk_ids for deletion from the index.
+        """
+        existing = self.get_chunk_ids(document_id)
+        stale = [(hash_, existing[hash_]) for hash_ in hashes if hash_ in existing]
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM indexed_chunks WHERE index_key = ? AND document_id = ? AND content_hash = ?",
+                [(self.index_key, document_id, hash_) for hash_, _ in stale]
+            )
+            self._conn.commit()
+        return [chunk_id for _, chunk_id in stale]
+
+    # ---------------------------------------------------------------- legacy
+
+    def get_legacy_filenames(self) -> List[str]:
+        """
+        Filenames whose chunks were indexed before chunks carried a document ID.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT doc_name FROM legacy_chunks WHERE index_key = ?", (self.index_key,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_legacy_chunk_ids(self, filename: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM legacy_chunks WHERE index_key = ? AND doc_name = ?",
+                (self.index_key, filename)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def assign_legacy(self, filename: str, document_id: str):
+        """
+        Record the legacy chunks (and indexed files) of `filename` as
+        belonging to `document_id`, once the index carries that ID.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO indexed_chunks"
+                " SELECT index_key, ?, content_hash, chunk_id FROM legacy_chunks"
+                " WHERE index_key = ? AND doc_name = ?",
+                (document_id, self.index_key, filename)
+            )
+            self._conn.execute(
+                "DELETE FROM legacy_chunks WHERE index_key = ? AND doc_name = ?",
+                (self.index_key, filename)
+            )
+            self._conn.execute(
+                "UPDATE indexed_documents SET document_id = ?"
+                " WHERE index_key = ? AND filename = ? AND document_id IS NULL",
+                (document_id, self.index_key, filename)
+            )
+            self._conn.commit()
+
+
+# Singleton-style accessor
+_chunk_registry: Optional[ChunkRegistry] = None
+_chunk_registry_lock = threading.Lock()
+
+
+def get_chunk_registry() -> ChunkRegistry:
+    global _chunk_registry
+    with _chunk_registry_lock:
+        if _chunk_registry is None:
+            backend = settings.VECTOR_STORE_BACKEND.lower()
+            location = settings.LOCAL_INDEX_DIR if backend == "local" else settings.PINECONE_INDEX_NAME
+            _chunk_registry = ChunkRegistry(
+                path=settings.CHUNK_REGISTRY_PATH or ":memory:",
+                index_key=f"{backend}:{location}"
+            )
+    return _chunk_registry
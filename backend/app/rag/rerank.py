@@ -0,0 +1,150 @@
+# backend/app/rag/rerank.py
+
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.rag.bm25 import tokenize
+
+# Chunks of one page whose character ranges are at most this far apart
+# are treated as adjacent and merged.
+ADJACENT_GAP = 2
+
+
+class _Passage:
+    """
+    One or more retrieved chunks of the same page, merged into a single span.
+    """
+
+    def __init__(self, doc: Document, rank: int):
+        self.doc = doc
+        self.rank = rank  # best retrieval rank among the merged chunks
+        self.start: Optional[int] = doc.metadata.get("start_index")
+        self.text = doc.page_content
+        self.chunk_ids = [doc.metadata.get("chunk_id")]
+        self._terms: Optional[FrozenSet[str]] = None
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+    @property
+    def terms(self) -> FrozenSet[str]:
+        if self._terms is None:
+            self._terms = frozenset(tokenize(self.text))
+        return self._terms
+
+    def absorb(self, other: "_Passage") -> bool:
+        """
+        Extend this span with `other` (which starts at or after it) when the
+        two overlap or touch. Offsets are trusted only if the overlapping
+        text actually matches.
+        """
+        if other.start > self.end + ADJACENT_GAP:
+            return False
+
+        overlap = min(self.end, other.end) - other.start
+        if overlap > 0:
+            offset = other.start - self.start
+            if self.text[offset:offset + overlap] != other.text[:overlap]:
+                return False
+            tail = other.text[overlap:]
+        else:
+            tail = "\n" + other.text
+
+        if other.end > self.end:
+            self.text += tail
+        self.rank = min(self.rank, other.rank)
+        self.chunk_ids.extend(other.chunk_ids)
+        self._terms = None
+        return True
+
+    def to_document(self) -> Document:
+        if len(self.chunk_ids) == 1:
+            return self.doc
+        metadata = {key: value for key, value in self.doc.metadata.items() if key != "text"}
+        metadata["merged_chunk_ids"] = self.chunk_ids
+        if "end_index" in metadata:
+            metadata["end_index"] = self.end
+        return Document(id=self.doc.id, page_content=self.text, metadata=metadata)
+
+
+def merge_overlapping(docs: List[Document]) -> List[_Passage]:
+    """
+    Merge retrieved chunks of the same page that overlap (chunk_overlap) or
+    are adjacent, using their start_index offsets. Chunks without offsets
+    (indexed before offsets were recorded) are kept as they are.
+    """
+    groups: Dict[Tuple, List[_Passage]] = {}
+    passages: List[_Passage] = []
+    for rank, doc in enumerate(docs):
+        passage = _Passage(doc, rank)
+        if passage.start is None:
+            passages.append(passage)
+            continue
+        # Two uploads may share a filename; only the document ID tells them apart
+        document = doc.metadata.get("doc_id") or doc.metadata.get("doc_name")
+        key = (document, doc.metadata.get("page_number"))
+        groups.setdefault(key, []).append(passage)
+
+    for group in groups.values():
+        group.sort(key=lambda p: p.start)
+        current = group[0]
+        for passage in group[1:]:
+            if not current.absorb(passage):
+                passages.append(current)
+                current = passage
+        passages.append(current)
+
+    passages.sort(key=lambda p: p.rank)
+    return passages
+
+
+def _similarity(a: _Passage, b: _Passage) -> float:
+    if not a.terms or not b.terms:
+        return 0.0
+    return len(a.terms & b.terms) / len(a.terms | b.terms)
+
+
+def mmr_select(passages: List[_Passage], k: int, lambda_mult: float) -> List[_Passage]:
+    """
+    Maximal marginal relevance over merged passages: trade retrieval rank
+    against term overlap (Jaccard) with the passages already chosen.
+
+    `k` is a budget in original chunks, so merging never grows the prompt
+    beyond what k separate chunks would have cost.
+    """
+    if not passages:
+        return []
+
+    count = len(passages)
+    remaining = list(passages)
+    selected: List[_Passage] = []
+    budget = k
+
+    while remaining and budget > 0:
+        best, best_score = None, float("-inf")
+        for passage in remaining:
+            if selected and len(passage.chunk_ids) > budget:
+                continue
+            relevance = 1.0 - passage.rank / count
+            redundancy = max((_similarity(passage, chosen) for chosen in selected), default=0.0)
+            score = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = passage, score
+        if best is None:
+            break
+        remaining.remove(best)
+        selected.append(best)
+        budget -= len(best.chunk_ids)
+
+    return selected
+
+
+def rerank_context(docs: List[Document], k: int, lambda_mult: float = 0.7) -> List[Document]:
+    """
+    Post-retrieval stage before build_prompt: merge overlapping chunks, then
+    pick a diverse, relevance-ordered set worth at most `k` chunks.
+    """
+    passages = merge_overlapping(docs)
+    return [passage.to_document() for passage in mmr_select(passages, k, lambda_mult)]
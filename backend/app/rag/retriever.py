@@ -1,25 +1,50 @@
-from langchain_pinecone import PineconeVectorStore
+import asyncio
+
+from app.rag.bm25 import get_bm25_index
+from app.rag.chunk_store import get_chunk_store
 from app.rag.embeddings import get_embedding_model
+from app.rag.vectorstore import get_vector_store, search_by_vector
 from typing import List, Dict, Optional
 from langchain_core.documents import Document
+from app.core import metrics
 from app.core.config import settings
 
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merge ranked result lists: each chunk scores sum(1 / (rrf_k + rank)) over
+    the lists it appears in. Chunks are matched by chunk_id.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [docs[key] for key in ranked[:k]]
+
+
 class PolicyRetriever:
     """
-    Handles similarity-based retrieval from Pinecone.
+    Handles similarity-based retrieval from the configured vector store
+    (Pinecone or the in-process local index, see VECTOR_STORE_BACKEND).
+
+    When HYBRID_SEARCH_ENABLED is set and the query text is known, BM25
+    keyword matches are fused with the vector results (reciprocal rank), so
+    exact clause references are found without raising k.
+
+    The vector index returns IDs and metadata only; the text of the final
+    top-k is read from the chunk store in one batch (see app.rag.chunk_store).
     """
 
     def __init__(self, k: int = 5):
         self.k = k
         self.index_name = settings.PINECONE_INDEX_NAME
-        
-        embedding_model = get_embedding_model()
 
-        self.vectorstore = PineconeVectorStore(
-            index_name=self.index_name,
-            embedding=embedding_model.embedder,
-            pinecone_api_key=settings.PINECONE_API_KEY
-        )
+        self.vectorstore = get_vector_store()
 
     def retrieve(self, query: str, filter: Optional[Dict] = None) -> List[Document]:
         """
@@ -27,11 +52,77 @@ class PolicyRetriever:
         
         Args:
             query: The user's question.
-            filter: Metadata filter dict (e.g. {"doc_name": {"$in": [...]}})
+            filter: Metadata filter dict (e.g. a workspace DocumentFilter, {"doc_id": {"$in": [...]}})
+        """
+        embedding = get_embedding_model().embed_query(query)
+        return self.retrieve_by_vector(embedding, filter=filter, query=query)
+
+    @property
+    def _candidates(self) -> int:
+        return max(self.k, settings.HYBRID_CANDIDATES)
+
+    def _hybrid(self, query: Optional[str]) -> bool:
+        return settings.HYBRID_SEARCH_ENABLED and bool(query)
+
+    def _vector_search(self, embedding: List[float], filter: Optional[Dict], k: int) -> List[Document]:
+        with metrics.span("vector_search"):
+            return search_by_vector(self.vectorstore, embedding, k=k, filter=filter)
+
+    def _keyword_search(self, query: str, filter: Optional[Dict]) -> List[Document]:
+        with metrics.span("keyword_search"):
+            return get_bm25_index().search(query, k=self._candidates, filter=filter)
+
+    def _fuse(self, vector_docs: List[Document], keyword_docs: List[Document]) -> List[Document]:
+        return reciprocal_rank_fusion([vector_docs, keyword_docs], k=self.k, rrf_k=settings.RRF_K)
+
+    @staticmethod
+    def _hydrate(docs: List[Document]) -> List[Document]:
+        with metrics.span("hydrate"):
+            return get_chunk_store().hydrate(docs)
+
+    def retrieve_by_vector(
+        self,
+        embedding: List[float],
+        filter: Optional[Dict] = None,
+        query: Optional[str] = None
+    ) -> List[Document]:
+        """
+        Retrieve top-K chunks for an already computed query embedding.
+        Pass the query text to fuse in keyword matches.
+        """
+        if not self._hybrid(query):
+            return self._hydrate(self._vector_search(embedding, filter, self.k))
+
+        return self._hydrate(self._fuse(
+            self._vector_search(embedding, filter, self._candidates),
+            self._keyword_search(query, filter)
+        ))
+
+    async def aretrieve(self, query: str, filter: Optional[Dict] = None) -> List[Document]:
         """
-        results = self.vectorstore.similarity_search(
-            query=query,
-            k=self.k,
-            filter=filter
+        Async variant of retrieve(). The query embedding is awaited on the
+        shared async HF client.
+        """
+        embedding = await get_embedding_model().aembed_query(query)
+        return await self.aretrieve_by_vector(embedding, filter=filter, query=query)
+
+    async def aretrieve_by_vector(
+        self,
+        embedding: List[float],
+        filter: Optional[Dict] = None,
+        query: Optional[str] = None
+    ) -> List[Document]:
+        """
+        The vector search itself is short and runs off the event loop: the
+        local index is CPU-bound, and the Pinecone client reuses its pooled
+        keep-alive connections across calls. Keyword search runs alongside it.
+        """
+        if not self._hybrid(query):
+            docs = await asyncio.to_thread(self._vector_search, embedding, filter, self.k)
+            return await asyncio.to_thread(self._hydrate, docs)
+
+        vector_docs, keyword_docs = await asyncio.gather(
+            asyncio.to_thread(self._vector_search, embedding, filter, self._candidates),
+            asyncio.to_thread(self._keyword_search, query, filter)
         )
-        return results
+        return await asyncio.to_thread(self._hydrate, self._fuse(vector_docs, keyword_docs))
@@ -0,0 +1,54 @@
+# backend/app/rag/scope.py
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Tuple
+
+
+class DocumentFilter(dict):
+    """
+    Retrieval scope over a fixed set of documents, by stable document ID:
+    {"doc_id": {"$in": [...]}}.
+
+    Built once per workspace (see MetadataStore.get_workspace_filter) and
+    reused for every query. It is a plain metadata filter to any store, and
+    carries precomputed forms for the stores that can use them:
+
+    - key:          content hash of the ID set; the local index caches its
+                    row selection under it
+    - doc_ids_json: the whole set as one JSON value, bound as a single SQL
+                    parameter by the keyword index
+    - chunks(n):    the set split into filters of at most n IDs, for
+                    Pinecone's per-filter limits
+    """
+
+    def __init__(self, doc_ids: Iterable[str]):
+        ids = sorted(set(doc_ids))
+        super().__init__(doc_id={"$in": ids})
+        self.doc_ids: Tuple[str, ...] = tuple(ids)
+        self.key = hashlib.sha256("\x00".join(ids).encode("utf-8")).hexdigest()
+        self.doc_ids_json = json.dumps(ids)
+        self._chunks: Dict[int, List[Dict]] = {}
+
+    def chunks(self, size: int) -> List[Dict]:
+        size = max(1, size)
+        if size not in self._chunks:
+            self._chunks[size] = [
+                {"doc_id": {"$in": list(self.doc_ids[i:i + size])}}
+                for i in range(0, len(self.doc_ids), size)
+            ]
+        return self._chunks[size]
+
+
+def filter_values(condition) -> List:
+    """
+    Values matched by one field's condition: {"$in": [...]}, {"$eq": x} or x.
+    """
+    if isinstance(condition, dict):
+        if set(condition) == {"$in"}:
+            return list(condition["$in"])
+        if set(condition) == {"$eq"}:
+            return [condition["$eq"]]
+        raise ValueError(f"Unsupported filter operator: {list(condition)}")
+    return [condition]
+
@@ -0,0 +1,744 @@
+# backend/app/rag/vectorstore.py
+
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.rag.embeddings import get_embedding_model
+from app.rag.scope import DocumentFilter, filter_values
+
+# Pinecone client and langchain_pinecone load only when the backend is used
+pinecone = lazy_import("pinecone")
+langchain_pinecone = lazy_import("langchain_pinecone")
+
+# Rows scored per matrix product. Keeps the temporary score buffer small
+# even when the index holds millions of chunks.
+SEARCH_BLOCK_ROWS = 16384
+
+# Metadata fields that get precomputed row ranges and can be filtered on.
+RANGE_FIELDS = ("doc_name", "doc_id")
+
+# Row selections of DocumentFilter scopes kept ready for search
+SELECTION_CACHE_SIZE = 256
+
+# A search block: a contiguous row range, or scattered rows gathered together
+Block = Union[Tuple[int, int], np.ndarray]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector index backed by NumPy.
+
+    Vectors are L2-normalized on insert and appended to a flat float32 file
+    that is memory-mapped for search, so cosine similarity is a plain dot
+    product. Metadata (and chunk text, when it is given) lives in a
+    JSON-lines file next to it.
+
+    Chunks of one document are indexed together, so each document occupies
+    one or more contiguous row ranges. Those ranges are precomputed per
+    value of RANGE_FIELDS, and a `{"doc_id": {"$in": [...]}}` filter only
+    scores the rows inside them. For a DocumentFilter (a workspace scope) the
+    resolved selection is cached under its key until rows are added, so
+    scoping costs the same for 10 or 10,000 documents.
+
+    Files are append-only: deleting (or re-adding) an ID tombstones its old
+    row, and tombstoned rows are masked out of search results. Rows written
+    after the last manifest update (an interrupted write) are truncated on
+    load, and only the last row of an ID is live.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    RECORDS_FILE = "records.jsonl"
+    MANIFEST_FILE = "manifest.json"
+    TOMBSTONES_FILE = "tombstones.i64"
+
+    def __init__(self, embedding: Embeddings, index_dir: str):
+        self._embedding = embedding
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+
+        self._dim: Optional[int] = None
+        self._count = 0
+        self._vectors: Optional[np.memmap] = None
+        self._records: List[Dict[str, Any]] = []
+        self._id_rows: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._has_tombstones = False
+        self._ranges: Dict[str, Dict[str, List[Tuple[int, int]]]] = {f: {} for f in RANGE_FIELDS}
+        # filter key -> (row count it was resolved at, search blocks)
+        self._selections = TTLCache(max_size=SELECTION_CACHE_SIZE, ttl_seconds=0)
+
+        os.makedirs(index_dir, exist_ok=True)
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ---------------------------------------------------------------- storage
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
+
+    def _load(self):
+        manifest_path = self._path(self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            # Nothing was committed; drop whatever a first, interrupted write left
+            self._truncate(0, 0)
+            return
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        self._dim = manifest["dim"]
+        count = manifest["count"]
+
+        # Records beyond the manifest count belong to an interrupted write
+        records_bytes = 0
+        records_path = self._path(self.RECORDS_FILE)
+        if os.path.exists(records_path):
+            with open(records_path, "rb") as f:
+                for line in f:
+                    if len(self._records) >= count or not line.endswith(b"\n"):
+                        break
+                    self._records.append(json.loads(line))
+                    records_bytes += len(line)
+
+        self._count = len(self._records)
+        # ... and are cut off, so the next append lines up with the manifest again
+        self._truncate(self._count * self._dim * 4, records_bytes)
+        self._live = np.ones(self._count, dtype=bool)
+        for row, record in enumerate(self._records):
+            # The last row of an ID wins: a re-add commits its rows before it
+            # tombstones the old one, and may have stopped in between
+            previous = self._id_rows.get(record["id"])
+            if previous is not None:
+                self._live[previous] = False
+            self._id_rows[record["id"]] = row
+            self._extend_ranges(row, row + 1, record["metadata"])
+
+        tombstones_path = self._path(self.TOMBSTONES_FILE)
+        if os.path.exists(tombstones_path):
+            rows = np.fromfile(tombstones_path, dtype=np.int64)
+            self._live[rows[rows < self._count]] = False
+        self._has_tombstones = not self._live.all()
+        for id_, row in list(self._id_rows.items()):
+            if not self._live[row]:
+                del self._id_rows[id_]
+        self._remap()
+
+    def _truncate(self, vectors_bytes: int, records_bytes: int):
+        for name, size in ((self.VECTORS_FILE, vectors_bytes), (self.RECORDS_FILE, records_bytes)):
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                print(f"⚠️ Truncating {path} to {size} bytes (interrupted write).")
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _remap(self):
+        if self._count == 0:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(
+            self._path(self.VECTORS_FILE),
+            dtype=np.float32,
+            mode="r",
+            shape=(self._count, self._dim)
+        )
+
+    def _extend_ranges(self, start: int, end: int, metadata: Dict[str, Any]):
+        for field in RANGE_FIELDS:
+            value = metadata.get(field)
+            if value is None:
+                continue
+            ranges = self._ranges[field].setdefault(value, [])
+            # Merge with the previous range when rows are contiguous
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+
+    def _tombstone(self, rows: List[int]):
+        if not rows:
+            return
+        with open(self._path(self.TOMBSTONES_FILE), "ab") as f:
+            f.write(np.asarray(rows, dtype=np.int64).tobytes())
+        self._live[rows] = False
+        self._has_tombstones = True
+
+    def _write_manifest(self):
+        tmp_path = self._path(self.MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self._dim, "count": self._count}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(self.MANIFEST_FILE))
+
+    # ---------------------------------------------------------------- writes
+
+    def add_embeddings(
+        self,
+        texts: Optional[List[str]],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """
+        Append precomputed embeddings to the index. Without `texts`, only IDs
+        and metadata are recorded (the text lives in app.rag.chunk_store).
+        """
+        if len(embeddings) == 0:
+            return []
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2 or (texts is not None and matrix.shape[0] != len(texts)):
+            raise ValueError("Expected one embedding per text.")
+        count = matrix.shape[0]
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        metadatas = metadatas or [{} for _ in range(count)]
+        ids = ids or [str(uuid.uuid4()) for _ in range(count)]
+
+        new_records = [
+            {"id": id_, "metadata": metadata}
+            for id_, metadata in zip(ids, metadatas)
+        ]
+        if texts is not None:
+            for record, text in zip(new_records, texts):
+                record["page_content"] = text
+
+        with self._lock:
+            if self._dim is None:
+                self._dim = matrix.shape[1]
+            elif matrix.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match index dimension {self._dim}."
+                )
+            self._append(matrix, new_records)
+
+        return ids
+
+    def _append(self, matrix: np.ndarray, new_records: List[Dict[str, Any]]):
+        """
+        Write normalized rows and their records (caller holds the lock).
+        """
+        ids = [record["id"] for record in new_records]
+        metadatas = [record["metadata"] for record in new_records]
+
+        start = self._count
+        with open(self._path(self.VECTORS_FILE), "ab") as f:
+            f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self._path(self.RECORDS_FILE), "a") as f:
+            for record in new_records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Manifest is written last, once the rows above are on disk: it
+        # marks them as committed.
+        self._count += len(new_records)
+        self._write_manifest()
+
+        # Upsert semantics: an ID that is added again replaces its old row
+        # (also within this batch). Crashing before the tombstones are written
+        # is safe: _load keeps the last row of each ID.
+        replaced = []
+        for offset, id_ in enumerate(ids):
+            if id_ in self._id_rows:
+                replaced.append(self._id_rows[id_])
+            self._id_rows[id_] = start + offset
+        self._live = np.concatenate([self._live, np.ones(len(new_records), dtype=bool)])
+        self._tombstone(replaced)
+
+        self._records.extend(new_records)
+        for offset, metadata in enumerate(metadatas):
+            self._extend_ranges(start + offset, start + offset + 1, metadata)
+        self._remap()
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, np.ndarray]:
+        """
+        id -> stored (normalized) vector, for the IDs that are indexed.
+        """
+        with self._lock:
+            found = [(id_, self._id_rows[id_]) for id_ in ids if id_ in self._id_rows]
+            if not found:
+                return {}
+            rows = np.asarray([row for _, row in found], dtype=np.int64)
+            vectors = np.array(self._vectors[rows])
+        return {id_: vector for (id_, _), vector in zip(found, vectors)}
+
+    def set_metadata(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Merge fields into the metadata of indexed IDs. Files are append-only,
+        so each updated row is re-appended (its vector copied, not re-embedded)
+        and the old row tombstoned. Returns the number of rows updated.
+        """
+        with self._lock:
+            found = [(id_, self._id_rows[id_]) for id_ in updates if id_ in self._id_rows]
+            if not found:
+                return 0
+            rows = np.asarray([row for _, row in found], dtype=np.int64)
+            matrix = np.array(self._vectors[rows])
+            new_records = []
+            for id_, row in found:
+                record = dict(self._records[row])
+                record["metadata"] = {**record["metadata"], **updates[id_]}
+                new_records.append(record)
+            self._append(matrix, new_records)
+        return len(found)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            rows = [self._id_rows.pop(id_) for id_ in ids if id_ in self._id_rows]
+            self._tombstone(rows)
+        return True
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas, ids)
+
+    # ---------------------------------------------------------------- search
+
+    def _candidate_ranges(self, filter: Optional[Dict]) -> List[Tuple[int, int]]:
+        if not filter:
+            return [(0, self._count)]
+
+        ranges: Optional[List[Tuple[int, int]]] = None
+        for field, condition in filter.items():
+            if field not in self._ranges:
+                raise ValueError(f"Filtering on '{field}' is not supported by the local index.")
+
+            field_ranges = []
+            for value in set(filter_values(condition)):
+                field_ranges.extend(self._ranges[field].get(value, []))
+
+            # Multiple fields are ANDed: keep only overlapping rows
+            ranges = field_ranges if ranges is None else _intersect_ranges(ranges, field_ranges)
+
+        return _merge_ranges(ranges or [])
+
+    def _candidate_blocks(self, filter: Optional[Dict]) -> List[Block]:
+        """
+        Rows to score for `filter`, as search blocks. Call with the lock held.
+        """
+        if not isinstance(filter, DocumentFilter):
+            return _blocks(self._candidate_ranges(filter))
+
+        cached = self._selections.get(filter.key)
+        if cached is not None and cached[0] == self._count:
+            return cached[1]
+        blocks = _blocks(self._candidate_ranges(filter))
+        self._selections.set(filter.key, (self._count, blocks))
+        return blocks
+
+    def search_by_vectors(
+        self,
+        queries: np.ndarray,
+        k: int = 4,
+        filter: Optional[Dict] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Top-k search for a batch of query vectors.
+
+        Returns, for each query, a list of (row, score) pairs sorted by score.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        # Snapshot under the lock; appends after this point are not visible.
+        with self._lock:
+            vectors = self._vectors
+            live = self._live if self._has_tombstones else None
+            blocks = self._candidate_blocks(filter) if vectors is not None else []
+
+        n_queries = queries.shape[0]
+        best_scores = np.full((n_queries, 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((n_queries, 0), dtype=np.int64)
+
+        for block in blocks:
+            if isinstance(block, tuple):
+                block_rows = np.arange(block[0], block[1], dtype=np.int64)
+                block_vectors = vectors[block[0]:block[1]]
+            else:
+                block_rows = block
+                block_vectors = vectors[block]
+            scores = queries @ block_vectors.T
+            if live is not None:
+                scores[:, ~live[block_rows]] = -np.inf
+            rows = np.broadcast_to(block_rows, scores.shape)
+
+            scores = np.concatenate([best_scores, scores], axis=1)
+            rows = np.concatenate([best_rows, rows], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                rows = np.take_along_axis(rows, top, axis=1)
+            best_scores, best_rows = scores, rows
+
+        results = []
+        for q in range(n_queries):
+            order = np.argsort(-best_scores[q])
+            results.append([
+                (int(best_rows[q, i]), float(best_scores[q, i]))
+                for i in order
+                if best_scores[q, i] != -np.inf  # tombstoned rows
+            ])
+        return results
+
+    def _to_document(self, row: int) -> Document:
+        record = self._records[row]
+        return Document(
+            id=record["id"],
+            page_content=record.get("page_content", ""),
+            metadata=dict(record["metadata"])
+        )
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_by_vectors(np.asarray([embedding]), k=k, filter=filter)[0]
+        return [(self._to_document(row), score) for row, score in hits]
+
+    def similarity_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict] = None,
+        **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[Dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        index_dir: Optional[str] = None,
+        **kwargs: Any
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, index_dir=index_dir or settings.LOCAL_INDEX_DIR)
+        store.add_texts(texts, metadatas, ids=ids)
+        return store
+
+
+def _merge_ranges(ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Sort ranges and join the ones that touch or overlap.
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _blocks(ranges: List[Tuple[int, int]]) -> List[Block]:
+    """
+    Group sorted row ranges into blocks of about SEARCH_BLOCK_ROWS rows:
+    long ranges are scored as slices, runs of short ones (many small
+    documents) are gathered into one block each, so a scope of thousands of
+    documents still takes a few matrix products rather than one per document.
+    """
+    blocks: List[Block] = []
+    gathered: List[Tuple[int, int]] = []
+    gathered_rows = 0
+
+    def flush():
+        nonlocal gathered, gathered_rows
+        if len(gathered) == 1:
+            blocks.append(gathered[0])
+        elif gathered:
+            blocks.append(np.concatenate([np.arange(s, e, dtype=np.int64) for s, e in gathered]))
+        gathered, gathered_rows = [], 0
+
+    for start, end in ranges:
+        if end - start >= SEARCH_BLOCK_ROWS:
+            flush()
+            for block_start in range(start, end, SEARCH_BLOCK_ROWS):
+                blocks.append((block_start, min(block_start + SEARCH_BLOCK_ROWS, end)))
+            continue
+        if gathered_rows + end - start > SEARCH_BLOCK_ROWS:
+            flush()
+        gathered.append((start, end))
+        gathered_rows += end - start
+    flush()
+    return blocks
+
+
+def _intersect_ranges(
+    a: List[Tuple[int, int]],
+    b: List[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    result = []
+    for a_start, a_end in a:
+        for b_start, b_end in b:
+            start, end = max(a_start, b_start), min(a_end, b_end)
+            if start < end:
+                result.append((start, end))
+    return result
+
+
+def _upsert_requests(vectors: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+    """
+    Split vectors into requests of at most UPSERT_MAX_VECTORS vectors and
+    roughly UPSERT_MAX_REQUEST_BYTES of JSON (Pinecone rejects requests over 2 MB).
+    """
+    max_vectors = max(1, settings.UPSERT_MAX_VECTORS)
+    request: List[Dict[str, Any]] = []
+    size = 0
+    for vector in vectors:
+        # ~10 bytes per float as JSON, plus the metadata
+        vector_size = 10 * len(vector["values"]) + len(json.dumps(vector["metadata"]))
+        if request and (len(request) >= max_vectors or size + vector_size > settings.UPSERT_MAX_REQUEST_BYTES):
+            yield request
+            request, size = [], 0
+        request.append(vector)
+        size += vector_size
+    if request:
+        yield request
+
+
+def upsert_embeddings(
+    vectorstore: VectorStore,
+    embeddings: List[List[float]],
+    metadatas: List[Dict[str, Any]],
+    ids: List[str]
+) -> List[str]:
+    """
+    Write precomputed embeddings to either backend without re-embedding.
+    Records hold IDs and metadata only; the chunk text goes to the chunk store.
+    """
+    if isinstance(vectorstore, LocalVectorStore):
+        return vectorstore.add_embeddings(None, embeddings, metadatas, ids)
+
+    if isinstance(vectorstore, langchain_pinecone.PineconeVectorStore):
+        vectors = [
+            {"id": id_, "values": values, "metadata": metadata}
+            for id_, values, metadata in zip(ids, embeddings, metadatas)
+        ]
+        for request in _upsert_requests(vectors):
+            vectorstore.index.upsert(vectors=request, show_progress=False)
+        return ids
+
+    raise TypeError(f"Unsupported vector store: {type(vectorstore).__name__}")
+
+
+def fetch_embeddings(vectorstore: VectorStore, ids: List[str]) -> Dict[str, List[float]]:
+    """
+    id -> stored vector for the given IDs (missing IDs are left out), so
+    unchanged chunks can be copied to a new ID without re-embedding.
+    """
+    if isinstance(vectorstore, LocalVectorStore):
+        return {id_: vector.tolist() for id_, vector in vectorstore.get_embeddings(ids).items()}
+
+    if isinstance(vectorstore, langchain_pinecone.PineconeVectorStore):
+        vectors: Dict[str, List[float]] = {}
+        max_ids = max(1, settings.UPSERT_MAX_VECTORS)
+        for start in range(0, len(ids), max_ids):
+            response = vectorstore.index.fetch(ids=ids[start:start + max_ids], namespace=vectorstore._namespace)
+            for id_, vector in response.vectors.items():
+                vectors[id_] = list(vector.values)
+        return vectors
+
+    raise TypeError(f"Unsupported vector store: {type(vectorstore).__name__}")
+
+
+def set_metadata(vectorstore: VectorStore, updates: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Merge fields into the stored metadata of existing IDs, without re-embedding.
+    """
+    if not updates:
+        return 0
+
+    if isinstance(vectorstore, LocalVectorStore):
+        return vectorstore.set_metadata(updates)
+
+    if isinstance(vectorstore, langchain_pinecone.PineconeVectorStore):
+        # One request per vector; run them on the shared query pool
+        futures = [
+            _get_query_pool().submit(
+                vectorstore.index.update, id=id_, set_metadata=fields, namespace=vectorstore._namespace
+            )
+            for id_, fields in updates.items()
+        ]
+        for future in futures:
+            future.result()
+        return len(futures)
+
+    raise TypeError(f"Unsupported vector store: {type(vectorstore).__name__}")
+
+
+_query_pool: Optional[ThreadPoolExecutor] = None
+_query_pool_lock = threading.Lock()
+
+
+def _get_query_pool() -> ThreadPoolExecutor:
+    global _query_pool
+    with _query_pool_lock:
+        if _query_pool is None:
+            _query_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.PINECONE_POOL_THREADS), thread_name_prefix="pinecone-query"
+            )
+    return _query_pool
+
+
+def _pinecone_query(vectorstore, embedding: List[float], k: int, filter: Optional[Dict]) -> List[Dict]:
+    results = vectorstore.index.query(
+        vector=embedding,
+        top_k=k,
+        include_metadata=True,
+        namespace=vectorstore._namespace,
+        filter=filter
+    )
+    return list(results["matches"])
+
+
+def _pinecone_search(vectorstore, embedding: List[float], k: int, filter: Optional[Dict]) -> List[Document]:
+    """
+    Queried directly: PineconeVectorStore drops every match without text_key.
+
+    A DocumentFilter larger than PINECONE_FILTER_MAX_IDS is sent as several
+    queries of at most that many IDs each, run concurrently; their matches
+    are merged by score.
+    """
+    if isinstance(filter, DocumentFilter) and len(filter.doc_ids) > settings.PINECONE_FILTER_MAX_IDS:
+        futures = [
+            _get_query_pool().submit(_pinecone_query, vectorstore, embedding, k, part)
+            for part in filter.chunks(settings.PINECONE_FILTER_MAX_IDS)
+        ]
+        matches = [match for future in futures for match in future.result()]
+        matches = sorted(matches, key=lambda match: match["score"], reverse=True)[:k]
+    else:
+        matches = _pinecone_query(vectorstore, embedding, k, filter)
+
+    docs = []
+    for match in matches:
+        metadata = dict(match.get("metadata") or {})
+        text = metadata.pop(vectorstore._text_key, "")
+        docs.append(Document(id=match["id"], page_content=text, metadata=metadata))
+    return docs
+
+
+def search_by_vector(
+    vectorstore: VectorStore,
+    embedding: List[float],
+    k: int,
+    filter: Optional[Dict] = None
+) -> List[Document]:
+    """
+    Top-k chunks for a query embedding, as Documents with IDs and metadata.
+    Their page_content is empty unless the record still carries its text
+    (indexed before text moved to the chunk store); see ChunkStore.hydrate.
+    """
+    if isinstance(vectorstore, langchain_pinecone.PineconeVectorStore):
+        return _pinecone_search(vectorstore, embedding, k, filter)
+
+    return vectorstore.similarity_search_by_vector(embedding, k=k, filter=filter)
+
+
+# Singleton-style accessors. The in-process index must be shared (ingestion
+# and retrieval have to see the same rows); the Pinecone store is shared so
+# every caller reuses one client and its pooled keep-alive connections.
+_local_store: Optional[LocalVectorStore] = None
+_pinecone_store: Optional["langchain_pinecone.PineconeVectorStore"] = None
+_store_lock = threading.Lock()
+
+
+def _create_pinecone_store(embedding: Embeddings) -> "langchain_pinecone.PineconeVectorStore":
+    if not settings.PINECONE_API_KEY:
+        raise ValueError("PINECONE_API_KEY is missing via env vars")
+
+    # pool_threads sizes the HTTP connection pool shared by concurrent
+    # queries and upserts (one Index handle, resolved once)
+    client = pinecone.Pinecone(api_key=settings.PINECONE_API_KEY, pool_threads=settings.PINECONE_POOL_THREADS)
+    index = client.Index(settings.PINECONE_INDEX_NAME, pool_threads=settings.PINECONE_POOL_THREADS)
+    return langchain_pinecone.PineconeVectorStore(index=index, embedding=embedding)
+
+
+def get_vector_store() -> VectorStore:
+    """
+    Return the vector store selected by settings.VECTOR_STORE_BACKEND.
+    """
+    embedding_model = get_embedding_model()
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+
+    if backend == "local":
+        global _local_store
+        with _store_lock:
+            if _local_store is None:
+                _local_store = LocalVectorStore(
+                    embedding=embedding_model.embedder,
+                    index_dir=settings.LOCAL_INDEX_DIR
+                )
+        return _local_store
+
+    if backend == "pinecone":
+        global _pinecone_store
+        with _store_lock:
+            if _pinecone_store is None:
+                _pinecone_store = _create_pinecone_store(embedding_model.embedder)
+        return _pinecone_store
+
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {settings.VECTOR_STORE_BACKEND}")
@@ -0,0 +1,170 @@
+import copy
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.rag.scope import DocumentFilter
+
+np = lazy_import("numpy")
+
+
+class _WorkspaceBucket:
+    """
+    Cached answers for one workspace, valid for one document set.
+    """
+
+    def __init__(self, scope: DocumentFilter):
+        self.scope_key = scope.key
+        self.doc_ids = frozenset(scope.doc_ids)
+        self.entry_ids: List[int] = []
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+
+class AnswerCache:
+    """
+    Workspace-scoped semantic cache of chat responses.
+
+    A question hits when its query embedding is within `similarity_threshold`
+    (cosine) of a cached question for the same workspace. A workspace's
+    entries are dropped as soon as its document set differs from the one the
+    answers were generated against, or when one of its documents is (re)indexed.
+    Eviction is LRU across all workspaces, bounded by `max_size` entries.
+    """
+
+    def __init__(self, max_size: int, similarity_threshold: float, ttl_seconds: float):
+        self.max_size = max_size
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, _WorkspaceBucket] = {}
+        # entry_id -> (workspace_id, response, latency_seconds, stored_at), in LRU order
+        self._entries: "OrderedDict[int, Tuple[str, Dict, float, float]]" = OrderedDict()
+        self._ids = itertools.count()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency_seconds = 0.0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> "np.ndarray":
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _bucket(self, workspace_id: str, scope: DocumentFilter) -> _WorkspaceBucket:
+        bucket = self._buckets.get(workspace_id)
+        if bucket is None or bucket.scope_key != scope.key:
+            if bucket is not None:
+                self._drop_bucket(workspace_id)
+                self.invalidations += 1
+            bucket = _WorkspaceBucket(scope)
+            self._buckets[workspace_id] = bucket
+        return bucket
+
+    def _drop_bucket(self, workspace_id: str):
+        bucket = self._buckets.pop(workspace_id, None)
+        if bucket is None:
+            return
+        for entry_id in bucket.entry_ids:
+            self._entries.pop(entry_id, None)
+
+    def _remove_entry(self, entry_id: int):
+        workspace_id = self._entries.pop(entry_id)[0]
+        bucket = self._buckets[workspace_id]
+        position = bucket.entry_ids.index(entry_id)
+        bucket.entry_ids.pop(position)
+        bucket.vectors = np.delete(bucket.vectors, position, axis=0)
+
+    def lookup(self, workspace_id: str, scope: DocumentFilter, embedding: List[float]) -> Optional[Dict]:
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._bucket(workspace_id, scope)
+            if bucket.entry_ids and bucket.vectors.shape[1] == query.shape[0]:
+                scores = bucket.vectors @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    entry_id = bucket.entry_ids[best]
+                    _, response, latency, stored_at = self._entries[entry_id]
+                    if self.ttl_seconds <= 0 or now - stored_at <= self.ttl_seconds:
+                        self._entries.move_to_end(entry_id)
+                        self.hits += 1
+                        self.saved_latency_seconds += latency
+                        return copy.deepcopy(response)
+                    self._remove_entry(entry_id)
+
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        workspace_id: str,
+        scope: DocumentFilter,
+        embedding: List[float],
+        response: Dict,
+        latency_seconds: float
+    ):
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            bucket = self._bucket(workspace_id, scope)
+            if bucket.entry_ids and bucket.vectors.shape[1] != vector.shape[0]:
+                # Embedding model changed; older vectors are not comparable
+                self._drop_bucket(workspace_id)
+                bucket = self._bucket(workspace_id, scope)
+
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (workspace_id, copy.deepcopy(response), latency_seconds, time.monotonic())
+            bucket.entry_ids.append(entry_id)
+            bucket.vectors = (
+                vector[None, :] if not bucket.vectors.size
+                else np.vstack([bucket.vectors, vector[None, :]])
+            )
+
+            while len(self._entries) > self.max_size:
+                self._remove_entry(next(iter(self._entries)))
+
+    def invalidate_workspace(self, workspace_id: str):
+        with self._lock:
+            if workspace_id in self._buckets:
+                self._drop_bucket(workspace_id)
+                self.invalidations += 1
+
+    def invalidate_document(self, document_id: str):
+        """
+        Drop cached answers for every workspace that reads from `document_id`
+        (e.g. once it finished indexing).
+        """
+        with self._lock:
+            for workspace_id, bucket in list(self._buckets.items()):
+                if document_id in bucket.doc_ids:
+                    self._drop_bucket(workspace_id)
+                    self.invalidations += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_latency_seconds, 3),
+            "invalidations": self.invalidations
+        }
+
+
+answer_cache = AnswerCache(
+    max_size=settings.ANSWER_CACHE_SIZE,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+)
+metrics.register_cache("answer", answer_cache.stats)
@@ -1,56 +1,183 @@
-import io
+import asyncio
+import os
+import tempfile
+import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from fastapi import UploadFile, HTTPException
-from pypdf import PdfReader
 
-from app.models.document import DocumentMetadata
-from app.rag.ingest import process_and_index_document
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.models.document import DocumentMetadata, IngestionJob
+from app.rag.registry import file_hasher, get_chunk_registry
+from app.services.answer_cache import answer_cache
+from app.services.ingestion_service import ingestion_queue
+from app.services.metadata_store import metadata_store
+from app.services.session_store import session_store
+
+# The backfill only touches the indexes when there is something to migrate
+bm25 = lazy_import("app.rag.bm25")
+vectorstores = lazy_import("app.rag.vectorstore")
+
+
+def _new_document_id() -> str:
+    # Timestamp IDs collided for uploads within the same second
+    return f"doc_{uuid.uuid4().hex[:12]}"
+
+
+def upload_too_large() -> HTTPException:
+    limit_mb = settings.UPLOAD_MAX_BYTES / (1024 * 1024)
+    return HTTPException(status_code=413, detail=f"File exceeds the {limit_mb:g} MB upload limit.")
+
+
+async def _save_upload(file: UploadFile) -> Tuple[str, str]:
+    """
+    Copy the upload to a temp file in UPLOAD_CHUNK_BYTES pieces, hashing as it
+    goes, so memory per upload stays bounded whatever the file size.
+
+    Returns (path, sha256). Raises 413 past UPLOAD_MAX_BYTES (oversized
+    request bodies are already cut off while they stream in, see
+    app.api.documents.UploadLimitRoute). The caller owns (and must delete)
+    the file.
+    """
+    # Reject early when the multipart part declared its size
+    if file.size is not None and file.size > settings.UPLOAD_MAX_BYTES:
+        raise upload_too_large()
+
+    hasher = file_hasher()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise upload_too_large()
+                hasher.update(chunk)
+                await asyncio.to_thread(tmp.write, chunk)
+    except BaseException:
+        os.remove(tmp.name)
+        raise
+
+    return tmp.name, hasher.hexdigest()
 
-# In-Memory Metadata Store (For Vercel demo purposes)
-# In a real app, use Supabase/Postgres.
-# This will reset on every server restart (Vercel cold boot).
-_memory_metadata_store = []
 
 class DocumentService:
     def list_documents(self) -> List[DocumentMetadata]:
-        return _memory_metadata_store
+        return metadata_store.list_documents()
+
+    def get_document(self, document_id: str) -> Optional[DocumentMetadata]:
+        return metadata_store.get_document(document_id)
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return ingestion_queue.get(job_id)
+
+    @staticmethod
+    def _on_ingested(document: DocumentMetadata, content_hash: str, chunk_count: int):
+        get_chunk_registry().add_document(
+            content_hash, document.filename, document.id, document.page_count, chunk_count
+        )
+        # Workspaces created while it was processing answered without it
+        answer_cache.invalidate_document(document.id)
+        session_store.invalidate_document(document.id)
+
+    @staticmethod
+    def backfill_document_ids():
+        """
+        Assign chunks indexed before chunks carried a document ID (recorded
+        by filename) to the document they belong to, so existing documents
+        and workspaces stay retrievable without a re-upload.
+
+        Uploads sharing a filename used to share one set of chunks (the
+        latest revision's), so they are assigned to the latest upload under
+        that name, and workspaces listing an earlier one are pointed at it.
+        Runs at startup; it is a no-op once everything is migrated, and
+        re-runs safely if interrupted.
+        """
+        registry = get_chunk_registry()
+        filenames = registry.get_legacy_filenames()
+        if not filenames:
+            return
+
+        vectorstore = vectorstores.get_vector_store()
+        for filename in filenames:
+            documents = metadata_store.get_documents_by_filename(filename)
+            if not documents:
+                print(f"⚠️ Indexed chunks of {filename} belong to no known document; left unassigned.")
+                continue
+            available = [document for document in documents if document.status == "available"]
+            current = (available or documents)[-1]
+
+            chunk_ids = registry.get_legacy_chunk_ids(filename)
+            vectorstores.set_metadata(vectorstore, {chunk_id: {"doc_id": current.id} for chunk_id in chunk_ids})
+            bm25.get_bm25_index().set_doc_id(chunk_ids, current.id)
+            metadata_store.replace_workspace_documents(
+                [document.id for document in documents if document.id != current.id], current.id
+            )
+            # Recorded last: an interrupted backfill starts over for this file
+            registry.assign_legacy(filename, current.id)
+            answer_cache.invalidate_document(current.id)
+            session_store.invalidate_document(current.id)
+            print(f"✅ Assigned {len(chunk_ids)} chunks of {filename} to document {current.id}")
 
     async def upload_document(self, file: UploadFile) -> DocumentMetadata:
+        """
+        Save the upload and queue it for background ingestion.
+        Returns immediately with status="processing" and the job ID to poll.
+        """
         # 1. Validation
         if not file.filename.endswith(".pdf"):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed.")
 
+        pdf_path = None
         try:
-            # 2. Read File to Memory
-            content = await file.read()
-            pdf_file = io.BytesIO(content)
-            
-            # 3. Extract Text (Basic Extraction)
-            reader = PdfReader(pdf_file)
-            text_content = ""
-            for page in reader.pages:
-                text_content += page.extract_text() + "\n"
-
-            # 4. Ingest to Pinecone
-            chunk_count = process_and_index_document(text_content, file.filename)
-
-            # 5. Metadata Registration (In-Memory)
-            doc_meta = DocumentMetadata(
-                id=f"doc_{int(datetime.now().timestamp())}",
-                filename=file.filename,
-                upload_timestamp=datetime.now(),
-                status="available",
-                page_count=len(reader.pages)
-            )
-            _memory_metadata_store.append(doc_meta)
-
-            return doc_meta
+            # 2. Stream to a temp file: the ingestion job (and its extraction
+            # workers) open the PDF by path. The job deletes it when done.
+            pdf_path, content_hash = await _save_upload(file)
 
+            # 3. Identical re-upload of an indexed file: nothing to extract or
+            # embed, it is the document already indexed (chunks are scoped by its ID)
+            indexed = get_chunk_registry().get_document(content_hash, file.filename)
+            existing = metadata_store.get_document(indexed["document_id"]) if indexed else None
+            if existing is not None and existing.status == "available":
+                os.remove(pdf_path)
+                return existing
+        except HTTPException:
+            raise
         except Exception as e:
+            if pdf_path:
+                os.remove(pdf_path)
             import traceback
             tb = traceback.format_exc()
-            print(f"Ingestion Error: {tb}")
-            raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)} | Trace: {tb[-200:]}")
+            print(f"Upload Error: {tb}")
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)} | Trace: {tb[-200:]}")
+
+        # 4. Metadata Registration
+        doc_meta = DocumentMetadata(
+            id=_new_document_id(),
+            filename=file.filename,
+            upload_timestamp=datetime.now(),
+            status="processing"
+        )
+
+        # 5. Queue extraction + indexing
+        try:
+            ingestion_queue.submit(
+                doc_meta,
+                pdf_path,
+                on_success=lambda document, chunk_count: self._on_ingested(document, content_hash, chunk_count),
+                on_update=metadata_store.save_document
+            )
+        except Exception:
+            os.remove(pdf_path)
+            raise
+
+        # The job may already have finished; the store serializes writes and
+        # saves whatever status the shared object holds at that point.
+        metadata_store.save_document(doc_meta)
+        return doc_meta
 
 document_service = DocumentService()
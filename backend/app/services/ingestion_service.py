@@ -0,0 +1,147 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.models.document import DocumentMetadata, IngestionJob
+
+# pypdf, LangChain splitters and the vector store load with the first upload
+extract = lazy_import("app.rag.extract")
+ingest = lazy_import("app.rag.ingest")
+
+
+class IngestionQueue:
+    """
+    Runs the extract -> chunk -> embed -> upsert pipeline in the background.
+
+    - INGEST_WORKERS jobs run at once; up to INGEST_MAX_PENDING more wait in
+      the queue, beyond that uploads are rejected with 503.
+    - Job records are kept in memory (last INGEST_JOB_HISTORY finished jobs)
+      and their progress counters are live while the job runs.
+    """
+
+    def __init__(self, workers: int, max_pending: int, history: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._history = history
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._progress = {}
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            progress = self._progress.get(job_id)
+            if job is None:
+                return None
+            if progress is not None:
+                job.pages_extracted = progress.pages_extracted
+                job.chunks_embedded = progress.chunks_embedded
+                job.chunks_upserted = progress.chunks_upserted
+                job.chunks_skipped = progress.chunks_skipped
+                job.chunks_reused = progress.chunks_reused
+            return job.model_copy()
+
+    def submit(
+        self,
+        document: DocumentMetadata,
+        pdf_path: str,
+        on_success: Callable[[DocumentMetadata, int], None],
+        on_update: Callable[[DocumentMetadata], None]
+    ) -> IngestionJob:
+        """
+        Queue ingestion of the PDF at `pdf_path` (the queue owns the file
+        and deletes it when done) and mark `document` as processing.
+        `on_update` persists the document whenever its status changes.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(status_code=503, detail="Ingestion queue is full. Please retry later.")
+
+        job = IngestionJob(
+            id=f"job_{uuid.uuid4().hex[:12]}",
+            document_id=document.id,
+            filename=document.filename,
+            created_at=datetime.now()
+        )
+        document.status = "processing"
+        document.job_id = job.id
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._progress[job.id] = ingest.IngestProgress()
+
+        try:
+            self._executor.submit(self._run, job, document, pdf_path, on_success, on_update)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def _run(
+        self,
+        job: IngestionJob,
+        document: DocumentMetadata,
+        pdf_path: str,
+        on_success: Callable[[DocumentMetadata, int], None],
+        on_update: Callable[[DocumentMetadata], None]
+    ):
+        progress = self._progress[job.id]
+        job.status = "processing"
+        job.started_at = datetime.now()
+
+        try:
+            chunk_count = ingest.process_and_index_document(
+                extract.iter_pdf_pages(pdf_path), document.filename, document.id, progress
+            )
+
+            document.page_count = progress.pages_extracted
+            document.status = "available"
+            job.status = "available"
+            on_success(document, chunk_count)
+            on_update(document)
+        except Exception as e:
+            import traceback
+            print(f"Ingestion Error ({job.id}): {traceback.format_exc()}")
+            document.status = "error"
+            job.status = "error"
+            job.error = str(e)
+            try:
+                on_update(document)
+            except Exception:
+                print(f"Ingestion Error ({job.id}): could not record failure: {traceback.format_exc()}")
+        finally:
+            job.finished_at = datetime.now()
+            try:
+                os.remove(pdf_path)
+            except OSError:
+                pass
+            self._finish(job)
+            self._slots.release()
+
+    def _finish(self, job: IngestionJob):
+        with self._lock:
+            progress = self._progress.pop(job.id)
+            job.pages_extracted = progress.pages_extracted
+            job.chunks_embedded = progress.chunks_embedded
+            job.chunks_upserted = progress.chunks_upserted
+            job.chunks_skipped = progress.chunks_skipped
+            job.chunks_reused = progress.chunks_reused
+
+            # Bound the job history: drop the oldest finished jobs
+            finished = [job_id for job_id in self._jobs if job_id not in self._progress]
+            for job_id in finished[:max(0, len(finished) - self._history)]:
+                del self._jobs[job_id]
+
+
+ingestion_queue = IngestionQueue(
+    workers=settings.INGEST_WORKERS,
+    max_pending=settings.INGEST_MAX_PENDING,
+    history=settings.INGEST_JOB_HISTORY
+)
@@ -0,0 +1,227 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.document import DocumentMetadata
+from app.models.workspace import Workspace
+from app.rag.scope import DocumentFilter
+
+# Stays below SQLite's bound-parameter limit (999 before 3.32)
+MAX_IDS_PER_QUERY = 500
+
+
+class MetadataStore:
+    """
+    Persistent document and workspace metadata (SQLite, WAL mode).
+
+    Lookups by ID use the primary-key index. Workspaces never change after
+    creation, so each workspace and its retrieval filter are resolved once
+    and then served from memory; the chat path does no per-request scans.
+    """
+
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._workspaces = TTLCache(max_size=cache_size, ttl_seconds=0)
+        self._workspace_filters = TTLCache(max_size=cache_size, ttl_seconds=0)
+
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        else:
+            # Private in-memory databases are per connection; share one instead
+            self.path = "file:metadata?mode=memory&cache=shared"
+            self._keepalive = self._conn()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                upload_timestamp TEXT NOT NULL,
+                status TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                job_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS workspaces (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS workspace_documents (
+                workspace_id TEXT NOT NULL REFERENCES workspaces (id),
+                position INTEGER NOT NULL,
+                document_id TEXT NOT NULL,
+                PRIMARY KEY (workspace_id, position)
+            );
+            """
+        )
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, uri=self.path.startswith("file:"), timeout=5)
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------- documents
+
+    @staticmethod
+    def _document(row) -> DocumentMetadata:
+        return DocumentMetadata(
+            id=row[0],
+            filename=row[1],
+            upload_timestamp=datetime.fromisoformat(row[2]),
+            status=row[3],
+            page_count=row[4],
+            job_id=row[5]
+        )
+
+    def save_document(self, document: DocumentMetadata):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    document.id,
+                    document.filename,
+                    document.upload_timestamp.isoformat(),
+                    document.status,
+                    document.page_count,
+                    document.job_id
+                )
+            )
+            conn.commit()
+
+    def get_document(self, document_id: str) -> Optional[DocumentMetadata]:
+        row = self._conn().execute(
+            "SELECT * FROM documents WHERE id = ?", (document_id,)
+        ).fetchone()
+        return self._document(row) if row else None
+
+    def get_documents(self, document_ids: Iterable[str]) -> Dict[str, DocumentMetadata]:
+        ids = list(dict.fromkeys(document_ids))
+        documents = {}
+        for i in range(0, len(ids), MAX_IDS_PER_QUERY):
+            batch = ids[i:i + MAX_IDS_PER_QUERY]
+            rows = self._conn().execute(
+                f"SELECT * FROM documents WHERE id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall()
+            documents.update((row[0], self._document(row)) for row in rows)
+        return documents
+
+    def get_documents_by_filename(self, filename: str) -> List[DocumentMetadata]:
+        """
+        Documents uploaded under `filename`, oldest first.
+        """
+        rows = self._conn().execute(
+            "SELECT * FROM documents WHERE filename = ? ORDER BY upload_timestamp", (filename,)
+        ).fetchall()
+        return [self._document(row) for row in rows]
+
+    def list_documents(self) -> List[DocumentMetadata]:
+        rows = self._conn().execute(
+            "SELECT * FROM documents ORDER BY upload_timestamp"
+        ).fetchall()
+        return [self._document(row) for row in rows]
+
+    # ------------------------------------------------------------ workspaces
+
+    def save_workspace(self, workspace: Workspace):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "INSERT INTO workspaces VALUES (?, ?, ?)",
+                (workspace.id, workspace.name, workspace.created_at.isoformat())
+            )
+            conn.executemany(
+                "INSERT INTO workspace_documents VALUES (?, ?, ?)",
+                [(workspace.id, position, doc_id) for position, doc_id in enumerate(workspace.document_ids)]
+            )
+            conn.commit()
+        self._workspaces.set(workspace.id, workspace)
+
+    def _load_workspace(self, row) -> Workspace:
+        doc_rows = self._conn().execute(
+            "SELECT document_id FROM workspace_documents WHERE workspace_id = ? ORDER BY position",
+            (row[0],)
+        ).fetchall()
+        return Workspace(
+            id=row[0],
+            name=row[1],
+            document_ids=[doc_row[0] for doc_row in doc_rows],
+            created_at=datetime.fromisoformat(row[2])
+        )
+
+    def get_workspace(self, workspace_id: str) -> Optional[Workspace]:
+        workspace = self._workspaces.get(workspace_id)
+        if workspace is not None:
+            return workspace
+
+        row = self._conn().execute(
+            "SELECT * FROM workspaces WHERE id = ?", (workspace_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        workspace = self._load_workspace(row)
+        self._workspaces.set(workspace_id, workspace)
+        return workspace
+
+    def list_workspaces(self) -> List[Workspace]:
+        rows = self._conn().execute(
+            "SELECT * FROM workspaces ORDER BY created_at"
+        ).fetchall()
+        return [self._load_workspace(row) for row in rows]
+
+    def replace_workspace_documents(self, document_ids: List[str], replacement: str):
+        """
+        Point workspaces that list any of `document_ids` at `replacement`
+        instead (and drop the cached workspaces and filters).
+        """
+        if not document_ids:
+            return
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "UPDATE workspace_documents SET document_id = ?"
+                " WHERE document_id IN (SELECT value FROM json_each(?))",
+                (replacement, json.dumps(document_ids))
+            )
+            conn.commit()
+        self._workspaces.clear()
+        self._workspace_filters.clear()
+
+    def get_workspace_filter(self, workspace_id: str) -> Optional[DocumentFilter]:
+        """
+        Retrieval filter over the workspace's documents (by document ID),
+        computed once per workspace.
+        """
+        scope = self._workspace_filters.get(workspace_id)
+        if scope is not None:
+            return scope
+
+        workspace = self.get_workspace(workspace_id)
+        if not workspace:
+            return None
+
+        documents = self.get_documents(workspace.document_ids)
+        scope = DocumentFilter(doc_id for doc_id in workspace.document_ids if doc_id in documents)
+        self._workspace_filters.set(workspace_id, scope)
+        return scope
+
+
+metadata_store = MetadataStore(settings.METADATA_DB_PATH or ":memory:")
+metrics.register_cache("workspace", metadata_store._workspaces.stats)
+metrics.register_cache("workspace_filter", metadata_store._workspace_filters.stats)
@@ -1,11 +1,24 @@
-from typing import Dict, List, Optional
+import asyncio
+import contextlib
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from fastapi import HTTPException
 
-from app.rag.retriever import PolicyRetriever
-from app.rag.prompt import build_prompt
+from app.core import metrics
+from app.core.config import settings
+from app.core.lazy import lazy_import
 from app.rag.generator import LLMGenerator
+from app.rag.embeddings import aclose_embedding_model, get_embedding_model
+from app.rag.scope import DocumentFilter
+from app.services.answer_cache import answer_cache
+from app.services.session_store import ConversationSession, session_store
 from app.services.workspace_service import workspace_service
 
+# LangChain / Pinecone-backed stages load with the first question
+retrieval = lazy_import("app.rag.retriever")
+prompting = lazy_import("app.rag.prompt")
+reranking = lazy_import("app.rag.rerank")
+
 REFUSAL_RESPONSE = "Answer not found in the provided documents."
 
 
@@ -13,64 +26,65 @@ class RAGService:
     def __init__(self):
         # Generator is global/shared
         self.generator = LLMGenerator()
-        # Retriever lazy init
-        self._retriever: Optional[PolicyRetriever] = None
+        # Retrievers lazy init
+        self._retriever: Optional["retrieval.PolicyRetriever"] = None
+        self._followup_retriever: Optional["retrieval.PolicyRetriever"] = None
 
     @property
-    def retriever(self) -> PolicyRetriever:
+    def retriever(self) -> "retrieval.PolicyRetriever":
         if self._retriever is None:
-            self._retriever = PolicyRetriever(k=7)
+            self._retriever = retrieval.PolicyRetriever(k=settings.RETRIEVAL_FETCH_K)
         return self._retriever
 
-    def run(self, question: str, workspace_id: str) -> Dict:
-        # Step 0: Validate Workspace & Get Filenames
-        workspace = workspace_service.get_workspace(workspace_id)
-        if not workspace:
-            raise HTTPException(status_code=404, detail="Workspace not found")
-        
-        filenames = workspace_service.get_workspace_filenames(workspace_id)
-        
-        if not filenames:
-             return {
-                "answer": "This workspace has no documents associated with it.",
-                "citations": []
-            }
+    @property
+    def followup_retriever(self) -> "retrieval.PolicyRetriever":
+        # Follow-ups only add to the context their session already holds
+        if self._followup_retriever is None:
+            self._followup_retriever = retrieval.PolicyRetriever(k=settings.SESSION_EXTEND_K)
+        return self._followup_retriever
 
-        # Step 1: build filter
-        # Pinecone "in" filter: {"doc_name": {"$in": ["a.pdf", "b.pdf"]}}
-        # If there are many files, this might hit filter limits, but fine for Vercel demo.
-        search_filter = {"doc_name": {"$in": filenames}}
+    def _resolve_scope(self, workspace_id: str) -> Tuple[Optional[DocumentFilter], Optional[Dict]]:
+        """
+        Validate the workspace and get the filter for the documents it
+        retrieves from (precomputed per workspace, by stable document ID).
 
-        # Step 2: Retrieve relevant documents
-        try:
-            docs = self.retriever.retrieve(question, filter=search_filter)
-        except Exception as e:
-            # Handle Pinecone errors (like index not ready)
-            print(f"Retrieval error: {e}")
-            return {
-                "answer": f"Error retrieving documents: {str(e)}",
-                "citations": []
-            }
+        Returns (scope, None), or (None, early_response) when there is
+        nothing to retrieve from.
+        """
+        # Step 0-1: Validate Workspace & get its filter
+        with metrics.span("workspace"):
+            workspace = workspace_service.get_workspace(workspace_id)
+            if not workspace:
+                raise HTTPException(status_code=404, detail="Workspace not found")
 
-        if not docs:
-            return {
-                "answer": f"{REFUSAL_RESPONSE} (Debug: Retrieved 0 documents from Pinecone. Index might be empty or filter mismatch.)",
+            scope = workspace_service.get_workspace_filter(workspace_id)
+
+        if not scope or not scope.doc_ids:
+             return None, {
+                "answer": "This workspace has no documents associated with it.",
                 "citations": []
             }
 
-        # Step 3: Build grounded prompt
-        prompt = build_prompt(question, docs)
+        return scope, None
 
-        # Step 4: Generate answer
-        answer = self.generator.generate(prompt)
+    @staticmethod
+    def _retrieval_error(e: Exception) -> Dict:
+        # Handle Pinecone errors (like index not ready)
+        print(f"Retrieval error: {e}")
+        return {
+            "answer": f"Error retrieving documents: {str(e)}",
+            "citations": []
+        }
 
-        # Step 5: Enforce refusal rule
-        if answer.strip() == REFUSAL_RESPONSE:
-            return {
-                "answer": REFUSAL_RESPONSE,
-                "citations": []
-            }
+    @staticmethod
+    def _no_documents() -> Dict:
+        return {
+            "answer": f"{REFUSAL_RESPONSE} (Debug: Retrieved 0 documents from Pinecone. Index might be empty or filter mismatch.)",
+            "citations": []
+        }
 
+    @staticmethod
+    def _citations(docs: List) -> List[Dict]:
         # Step 6: Build citations from metadata
         citations: List[Dict] = []
         for doc in docs:
@@ -79,8 +93,322 @@ class RAGService:
                 "page_number": doc.metadata.get("page_number"),
                 "snippet": doc.page_content.strip()
             })
+        return citations
+
+    @staticmethod
+    def _rerank(docs: List) -> List:
+        # Merge overlapping chunks and diversify (MMR) before prompt building
+        with metrics.span("rerank"):
+            return reranking.rerank_context(docs, k=settings.RETRIEVAL_K, lambda_mult=settings.MMR_LAMBDA)
+
+    @staticmethod
+    def _build_prompt(question: str, docs: List, history: Optional[List] = None) -> Tuple[str, List]:
+        with metrics.span("prompt"):
+            return prompting.build_prompt(question, docs, history=history)
+
+    def _build_response(self, answer: str, docs: List) -> Dict:
+        # Step 5: Enforce refusal rule
+        if answer.strip() == REFUSAL_RESPONSE:
+            return {
+                "answer": REFUSAL_RESPONSE,
+                "citations": []
+            }
 
         return {
             "answer": answer,
-            "citations": citations
+            "citations": self._citations(docs)
         }
+
+    def _cache_lookup(self, workspace_id: str, scope: DocumentFilter, embedding: List[float]) -> Optional[Dict]:
+        if not settings.ANSWER_CACHE_ENABLED or not embedding:
+            return None
+        with metrics.span("answer_cache"):
+            return answer_cache.lookup(workspace_id, scope, embedding)
+
+    def _cache_store(
+        self,
+        workspace_id: str,
+        scope: DocumentFilter,
+        embedding: List[float],
+        response: Dict,
+        started: float
+    ):
+        # Only answers the LLM actually produced are worth reusing
+        if not settings.ANSWER_CACHE_ENABLED or not embedding or self.generator.is_error(response["answer"]):
+            return
+        answer_cache.store(workspace_id, scope, embedding, response, time.perf_counter() - started)
+
+    async def _aretrieve(
+        self,
+        question: str,
+        scope: DocumentFilter,
+        embedding: List[float],
+        session: Optional[ConversationSession] = None
+    ) -> List:
+        """
+        Retrieve context for a question. In a session, the chunks retrieved
+        for earlier questions are reused as they are when this question is
+        close to the previous one, and extended by a small retrieval otherwise.
+        """
+        if session is None:
+            return await self.retriever.aretrieve_by_vector(embedding, filter=scope, query=question)
+
+        cached, reusable = session_store.context(session, scope, embedding)
+        if reusable:
+            metrics.SESSION_RETRIEVALS.inc(result="reused")
+            return cached
+
+        query = session.search_query(question)
+        if not cached:
+            metrics.SESSION_RETRIEVALS.inc(result="full")
+            return await self.retriever.aretrieve_by_vector(embedding, filter=scope, query=query)
+
+        metrics.SESSION_RETRIEVALS.inc(result="extended")
+        docs = await self.followup_retriever.aretrieve_by_vector(embedding, filter=scope, query=query)
+        return session_store.extend(docs, cached)
+
+    def _record_turn(
+        self,
+        session: Optional[ConversationSession],
+        question: str,
+        response: Dict,
+        scope: Optional[DocumentFilter] = None,
+        embedding: Optional[List[float]] = None,
+        docs: Optional[List] = None
+    ):
+        # A failed generation is not part of the conversation
+        if session is None or self.generator.is_error(response["answer"]):
+            return
+        session_store.record(session, question, response["answer"], scope, embedding, docs)
+
+    async def arun(self, question: str, workspace_id: str, session_id: Optional[str] = None) -> Dict:
+        """
+        Answer one question. Embedding, retrieval and generation are awaited
+        on pooled async clients, so a single worker can serve many in-flight questions.
+
+        The question is asked in the conversation `session_id` (a new one when
+        it is missing or expired); the response carries the session's ID.
+        """
+        scope, early_response = self._resolve_scope(workspace_id)
+        if early_response:
+            return early_response
+
+        session = session_store.open(session_id, workspace_id)
+        try:
+            with metrics.span("embed_query"):
+                embedding = await get_embedding_model().aembed_query(question)
+        except Exception as e:
+            return {**self._retrieval_error(e), "session_id": session.id}
+
+        response = await self._aanswer(question, workspace_id, scope, embedding, session=session)
+        return {**response, "session_id": session.id}
+
+    async def _aanswer(
+        self,
+        question: str,
+        workspace_id: str,
+        scope: DocumentFilter,
+        embedding: List[float],
+        generation_slots: Optional[asyncio.Semaphore] = None,
+        session: Optional[ConversationSession] = None
+    ) -> Dict:
+        """
+        Answer one already-embedded question: cache, retrieval, prompt, generation.
+        `generation_slots` bounds how many LLM calls a batch runs at once.
+
+        In a `session`, earlier turns go into the prompt; a follow-up depends
+        on them, so only a session's first question uses the answer cache.
+        """
+        history = session.history() if session else []
+        try:
+            if not history:
+                cached = self._cache_lookup(workspace_id, scope, embedding)
+                if cached:
+                    self._record_turn(session, question, cached)
+                    return cached
+
+            started = time.perf_counter()
+            with metrics.span("retrieval"):
+                retrieved = await self._aretrieve(question, scope, embedding, session)
+        except Exception as e:
+            return self._retrieval_error(e)
+
+        if not retrieved:
+            return self._no_documents()
+
+        docs = self._rerank(retrieved)
+        prompt, docs = self._build_prompt(question, docs, history)
+        async with generation_slots or contextlib.nullcontext():
+            with metrics.span("generation"):
+                answer = await self.generator.agenerate(prompt)
+
+        response = self._build_response(answer, docs)
+        if not history:
+            self._cache_store(workspace_id, scope, embedding, response, started)
+        self._record_turn(session, question, response, scope, embedding, retrieved)
+        return response
+
+    def stream_batch(self, questions: List[str], workspace_id: str) -> AsyncIterator[Tuple[int, Dict]]:
+        """
+        Answer many questions against one workspace, yielding (index, response)
+        pairs in completion order. A question that failed gets {"error": ...}.
+
+        All questions are embedded with one batched call, retrievals run
+        concurrently and at most BATCH_CHAT_MAX_CONCURRENCY generations are in
+        flight. Like stream(), the workspace is validated before streaming starts.
+        """
+        scope, early_response = self._resolve_scope(workspace_id)
+        return self._astream_batch(questions, workspace_id, scope, early_response)
+
+    async def _astream_batch(
+        self,
+        questions: List[str],
+        workspace_id: str,
+        scope: Optional[DocumentFilter],
+        early_response: Optional[Dict]
+    ) -> AsyncIterator[Tuple[int, Dict]]:
+        if early_response is None:
+            try:
+                with metrics.span("embed_query"):
+                    embeddings = await get_embedding_model().aembed_queries(questions)
+            except Exception as e:
+                early_response = self._retrieval_error(e)
+
+        if early_response is not None:
+            for index in range(len(questions)):
+                yield index, early_response
+            return
+
+        generation_slots = asyncio.Semaphore(max(1, settings.BATCH_CHAT_MAX_CONCURRENCY))
+
+        async def answer(index: int) -> Tuple[int, Dict]:
+            try:
+                response = await self._aanswer(
+                    questions[index], workspace_id, scope, embeddings[index], generation_slots
+                )
+            except Exception as e:
+                # One failing question must not abort the rest of the batch
+                import traceback
+                print(f"Batch Chat Error (question {index}): {traceback.format_exc()}")
+                response = {"error": f"Chat failed: {str(e)}"}
+            return index, response
+
+        tasks = [asyncio.create_task(answer(index)) for index in range(len(questions))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop the questions still running
+            for task in tasks:
+                task.cancel()
+
+    def stream(
+        self,
+        question: str,
+        workspace_id: str,
+        session_id: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Streaming variant of arun(), yielding (event, data) pairs:
+
+        - "citations": sent as soon as retrieval finishes
+        - "token":     answer text fragments, in order
+        - "done":      final event with the full answer, a `refused` flag
+                       and the `session_id` the question was asked in
+
+        An LLM failure raises LLMError once the stream has started (after
+        any tokens already yielded); the endpoint reports it as an error.
+
+        Workspace validation happens here, before the stream starts,
+        so an unknown workspace still surfaces as a plain 404.
+        """
+        scope, early_response = self._resolve_scope(workspace_id)
+        session = None if early_response else session_store.open(session_id, workspace_id)
+        return self._astream(question, workspace_id, scope, early_response, session)
+
+    async def _astream(
+        self,
+        question: str,
+        workspace_id: str,
+        scope: Optional[DocumentFilter],
+        early_response: Optional[Dict],
+        session: Optional[ConversationSession] = None
+    ) -> AsyncIterator[Tuple[str, Dict]]:
+        embedding: List[float] = []
+        history = session.history() if session else []
+        session_fields = {"session_id": session.id} if session else {}
+        if early_response is None:
+            try:
+                with metrics.span("embed_query"):
+                    embedding = await get_embedding_model().aembed_query(question)
+                if not history:
+                    early_response = self._cache_lookup(workspace_id, scope, embedding)
+                    if early_response is not None:
+                        self._record_turn(session, question, early_response)
+
+                if early_response is None:
+                    started = time.perf_counter()
+                    with metrics.span("retrieval"):
+                        retrieved = await self._aretrieve(question, scope, embedding, session)
+                    if not retrieved:
+                        early_response = self._no_documents()
+            except Exception as e:
+                early_response = self._retrieval_error(e)
+
+        if early_response is not None:
+            # _no_documents() appends a debug note to the refusal string
+            refused = early_response["answer"].startswith(REFUSAL_RESPONSE)
+            yield "citations", {"citations": early_response["citations"]}
+            yield "token", {"text": early_response["answer"]}
+            yield "done", {"answer": early_response["answer"], "refused": refused, **session_fields}
+            return
+
+        docs = self._rerank(retrieved)
+        prompt, docs = self._build_prompt(question, docs, history)
+        yield "citations", {"citations": self._citations(docs)}
+
+        # Enforce refusal rule: hold tokens back while the answer could still be
+        # REFUSAL_RESPONSE, so a refusal is never streamed as a partial answer.
+        # An LLMError propagates: the partial answer is neither cached nor
+        # recorded in the session.
+        answer = ""
+        held_back = True
+        generation_started = time.perf_counter()
+        async for text in self.generator.astream(prompt):
+            if not answer:
+                metrics.record("first_token", time.perf_counter() - generation_started)
+            answer += text
+            if held_back:
+                if REFUSAL_RESPONSE.startswith(answer.lstrip()):
+                    continue
+                held_back = False
+                text = answer
+            yield "token", {"text": text}
+
+        metrics.record("generation", time.perf_counter() - generation_started)
+
+        if not answer.strip():
+            answer = REFUSAL_RESPONSE
+        response = self._build_response(answer, docs)
+        if not history:
+            self._cache_store(workspace_id, scope, embedding, response, started)
+        self._record_turn(session, question, response, scope, embedding, retrieved)
+
+        if response["answer"] == REFUSAL_RESPONSE:
+            # Citations already sent must be discarded by the client.
+            yield "token", {"text": REFUSAL_RESPONSE}
+            yield "done", {"answer": REFUSAL_RESPONSE, "refused": True, "citations": [], **session_fields}
+            return
+
+        if held_back:
+            # Stream ended on a strict prefix of the refusal string
+            yield "token", {"text": answer}
+
+        yield "done", {"answer": answer, "refused": False, **session_fields}
+
+    async def aclose(self):
+        """
+        Release pooled async HTTP clients (called on app shutdown).
+        """
+        await self.generator.aclose()
+        await aclose_embedding_model()
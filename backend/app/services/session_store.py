@@ -0,0 +1,166 @@
+import itertools
+import threading
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.rag.scope import DocumentFilter
+
+np = lazy_import("numpy")
+
+
+def _normalize(embedding: List[float]) -> "np.ndarray":
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ConversationSession:
+    """
+    One conversation against one workspace: its last turns and the chunks
+    retrieved for it so far, valid for one document set.
+    """
+
+    def __init__(self, session_id: str, workspace_id: str, max_turns: int):
+        self.id = session_id
+        self.workspace_id = workspace_id
+        self.turns: Deque[Tuple[str, str]] = deque(maxlen=max(1, max_turns))
+        self.chunks: List = []
+        self.scope_key: Optional[str] = None
+        self.version = 0
+        self.query_vector: Optional["np.ndarray"] = None
+        self.lock = threading.Lock()
+
+    def history(self) -> List[Tuple[str, str]]:
+        """
+        (question, answer) pairs, oldest first.
+        """
+        with self.lock:
+            return list(self.turns)
+
+    def search_query(self, question: str) -> str:
+        """
+        Keyword query for a follow-up: "and what about processors?" alone
+        matches nothing specific, so the previous question is searched too.
+        """
+        with self.lock:
+            if not self.turns:
+                return question
+            return f"{self.turns[-1][0]} {question}"
+
+
+class SessionStore:
+    """
+    Server-side conversation sessions (LRU + TTL, see TTLCache).
+
+    A session expires `ttl_seconds` after its last question and keeps at most
+    `max_turns` turns. It also caches the chunks retrieved for it, so a
+    follow-up close to the previous question (cosine >= `reuse_similarity`)
+    is answered from them without retrieving, and any other follow-up only
+    needs a small retrieval to extend them. Cached chunks are dropped when the
+    workspace's document set changes or a document is (re)indexed.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        ttl_seconds: float,
+        max_turns: int,
+        max_chunks: int,
+        reuse_similarity: float
+    ):
+        self.max_turns = max_turns
+        self.max_chunks = max_chunks
+        self.reuse_similarity = reuse_similarity
+        self._sessions = TTLCache(max_size=max_sessions, ttl_seconds=ttl_seconds)
+        # Bumped whenever indexed content changes; older cached chunks are stale
+        self._versions = itertools.count(1)
+        self._version = 0
+
+    def open(self, session_id: Optional[str], workspace_id: str) -> ConversationSession:
+        """
+        The session to answer in. An unknown or expired `session_id`, or one
+        from another workspace, starts a new session (with a new ID).
+        """
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None or session.workspace_id != workspace_id:
+            session = ConversationSession(f"sess_{uuid.uuid4().hex}", workspace_id, self.max_turns)
+        # Re-stored on every question: the TTL counts from the last use
+        self._sessions.set(session.id, session)
+        return session
+
+    def context(
+        self,
+        session: ConversationSession,
+        scope: DocumentFilter,
+        embedding: List[float]
+    ) -> Tuple[List, bool]:
+        """
+        The session's cached chunks (empty if they no longer apply) and
+        whether they can be reused as they are for this query.
+        """
+        query = _normalize(embedding)
+        with session.lock:
+            if session.scope_key != scope.key or session.version != self._version:
+                session.chunks = []
+            if not session.chunks or session.query_vector is None:
+                return [], False
+            if session.query_vector.shape != query.shape:
+                return list(session.chunks), False
+            similarity = float(session.query_vector @ query)
+            return list(session.chunks), similarity >= self.reuse_similarity
+
+    def extend(self, retrieved: List, cached: List) -> List:
+        """
+        New chunks first (they answer the current question), then the cached
+        ones not retrieved again, at most `max_chunks` in total.
+        """
+        merged: Dict = {}
+        for doc in itertools.chain(retrieved, cached):
+            merged.setdefault(doc.metadata.get("chunk_id") or doc.page_content, doc)
+        return list(merged.values())[:self.max_chunks]
+
+    def record(
+        self,
+        session: ConversationSession,
+        question: str,
+        answer: str,
+        scope: Optional[DocumentFilter] = None,
+        embedding: Optional[List[float]] = None,
+        chunks: Optional[List] = None
+    ):
+        """
+        Append a turn; with `chunks`, they become the session's context for
+        the next question.
+        """
+        with session.lock:
+            session.turns.append((question, answer))
+            if chunks is not None and scope is not None and embedding:
+                session.chunks = chunks[:self.max_chunks]
+                session.scope_key = scope.key
+                session.version = self._version
+                session.query_vector = _normalize(embedding)
+
+    def invalidate_document(self, document_id: str):
+        """
+        Drop cached chunks of every session once `document_id` finished
+        indexing (sessions do not track which documents they read from).
+        """
+        self._version = next(self._versions)
+
+    def stats(self) -> Dict:
+        return self._sessions.stats()
+
+
+session_store = SessionStore(
+    max_sessions=settings.SESSION_MAX_COUNT,
+    ttl_seconds=settings.SESSION_TTL_SECONDS,
+    max_turns=settings.SESSION_MAX_TURNS,
+    max_chunks=settings.SESSION_MAX_CHUNKS,
+    reuse_similarity=settings.SESSION_REUSE_SIMILARITY
+)
+metrics.register_cache("session", session_store.stats)
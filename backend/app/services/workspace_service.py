@@ -4,31 +4,22 @@ from typing import List, Optional
 from fastapi import HTTPException
 
 from app.models.workspace import Workspace, CreateWorkspaceRequest
-from app.services.document_service import document_service
-
-# In-Memory Store
-_memory_workspace_store = []
+from app.rag.scope import DocumentFilter
+from app.services.metadata_store import metadata_store
 
 class WorkspaceService:
     def get_workspace(self, workspace_id: str) -> Optional[Workspace]:
-        for item in _memory_workspace_store:
-            if item.id == workspace_id:
-                return item
-        return None
+        return metadata_store.get_workspace(workspace_id)
 
     def list_workspaces(self) -> List[Workspace]:
-        return _memory_workspace_store
+        return metadata_store.list_workspaces()
 
     def create_workspace(self, request: CreateWorkspaceRequest) -> Workspace:
-        # 1. Validate Documents
-        all_docs = document_service.list_documents()
-        valid_doc_map = {d.id: d.filename for d in all_docs}
-        
-        target_filenames = []
+        # 1. Validate Documents (one indexed lookup for the whole set)
+        valid_docs = metadata_store.get_documents(request.document_ids)
         for doc_id in request.document_ids:
-            if doc_id not in valid_doc_map:
+            if doc_id not in valid_docs:
                 raise HTTPException(status_code=404, detail=f"Document ID {doc_id} not found.")
-            target_filenames.append(valid_doc_map[doc_id])
 
         # 2. logical grouping (No physical cloning needed for Pinecone)
         workspace_id = f"ws_{str(uuid.uuid4())[:8]}"
@@ -41,26 +32,14 @@ class WorkspaceService:
             created_at=datetime.now()
         )
 
-        _memory_workspace_store.append(new_workspace)
+        metadata_store.save_workspace(new_workspace)
         return new_workspace
 
-    def get_workspace_filenames(self, workspace_id: str) -> List[str]:
+    def get_workspace_filter(self, workspace_id: str) -> Optional[DocumentFilter]:
         """
-        Helper to get the actual filenames for a workspace
-        to build the vector filter.
+        Helper to get the vector filter for a workspace (its document IDs).
+        Precomputed once per workspace.
         """
-        workspace = self.get_workspace(workspace_id)
-        if not workspace:
-            return []
-        
-        all_docs = document_service.list_documents()
-        valid_doc_map = {d.id: d.filename for d in all_docs}
-        
-        filenames = []
-        for doc_id in workspace.document_ids:
-             if doc_id in valid_doc_map:
-                 filenames.append(valid_doc_map[doc_id])
-                 
-        return filenames
+        return metadata_store.get_workspace_filter(workspace_id)
 
 workspace_service = WorkspaceService()
@@ -0,0 +1,117 @@
+# backend/benchmarks/chunking.py
+"""
+Chunker comparison: the structure-aware chunker used by ingestion
+(app/rag/chunker.py) against the generic RecursiveCharacterTextSplitter it
+replaced, on the same extracted pages.
+
+Reports throughput and the size of what each chunk costs to store: the
+upsert payload is the JSON of text plus metadata per vector. The previous
+layout also copied the text into metadata["text"].
+
+Usage (from backend/):
+
+    python -m benchmarks.chunking
+    python -m benchmarks.chunking --pdf data/documents/gdpr.pdf --iterations 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.run import DEFAULT_PDF, _configure_environment, percentile
+
+
+def _payload_bytes(chunks, duplicate_text: bool) -> int:
+    total = 0
+    for chunk in chunks:
+        metadata = dict(chunk.metadata)
+        if duplicate_text:
+            metadata["text"] = chunk.page_content
+        total += len(json.dumps({"text": chunk.page_content, "metadata": metadata}).encode("utf-8"))
+    return total
+
+
+def measure(
+    split: Callable[[], List],
+    pages: List[Tuple[int, str]],
+    iterations: int,
+    duplicate_text: bool
+) -> Dict[str, float]:
+    latencies = []
+    chunks: List = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        chunks = split()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+
+    p50 = percentile(latencies, 50)
+    text_bytes = sum(len(text.encode("utf-8")) for _, text in pages)
+    return {
+        "p50_ms": p50 * 1000,
+        "pages_per_s": len(pages) / p50 if p50 else 0.0,
+        "mb_per_s": text_bytes / p50 / 1e6 if p50 else 0.0,
+        "chunks": len(chunks),
+        "avg_chunk_chars": sum(len(c.page_content) for c in chunks) / max(1, len(chunks)),
+        "payload_kb": _payload_bytes(chunks, duplicate_text) / 1024,
+    }
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    from langchain_core.documents import Document
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    from app.rag.extract import iter_pdf_pages
+    from app.rag.ingest import chunk_page, new_splitter
+
+    filename = os.path.basename(args.pdf)
+    pages = list(iter_pdf_pages(args.pdf))
+
+    def recursive() -> List:
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+        return splitter.split_documents([
+            Document(page_content=text, metadata={"doc_name": filename, "page_number": number})
+            for number, text in pages
+        ])
+
+    def structure() -> List:
+        splitter = new_splitter()
+        return [c for number, text in pages for c in chunk_page(splitter, filename, number, text)]
+
+    return {
+        "recursive (old)": measure(recursive, pages, args.iterations, duplicate_text=True),
+        "structure": measure(structure, pages, args.iterations, duplicate_text=False),
+    }
+
+
+def print_table(results: Dict[str, Dict[str, float]]):
+    print(f"{'splitter':<16} {'p50 ms':>8} {'pages/s':>9} {'MB/s':>7} {'chunks':>7} {'avg chars':>10} {'payload KB':>11}")
+    for name, r in results.items():
+        print(f"{name:<16} {r['p50_ms']:>8.1f} {r['pages_per_s']:>9.0f} {r['mb_per_s']:>7.2f} "
+              f"{r['chunks']:>7} {r['avg_chunk_chars']:>10.0f} {r['payload_kb']:>11.1f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the ingestion chunker with the recursive splitter.")
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="PDF to extract and chunk")
+    parser.add_argument("--iterations", type=int, default=10, help="whole-document runs per splitter")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as index_dir:
+        _configure_environment(index_dir)
+        results = run(args)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# backend/benchmarks/fakes.py
+"""
+Deterministic local stand-ins for the remote services (HF Inference,
+Pinecone, Groq). Each one sleeps for a configurable latency, so a benchmark
+measures our own overhead plus a realistic, repeatable service time.
+"""
+
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, List
+
+import numpy as np
+
+from app.rag.generator import ERROR_PREFIXES
+from app.rag.vectorstore import LocalVectorStore
+
+
+def _seconds(ms: float) -> float:
+    return max(0.0, ms) / 1000.0
+
+
+class FakeEmbeddingModel:
+    """
+    Drop-in for app.rag.embeddings.EmbeddingModel.
+
+    Vectors are seeded from a hash of the text, so the same text always
+    embeds to the same vector. Each call costs `latency_ms` plus
+    `per_item_ms` per text.
+    """
+
+    def __init__(self, dim: int = 384, latency_ms: float = 20.0, per_item_ms: float = 0.5):
+        self.model_name = "fake-embedding"
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.per_item_ms = per_item_ms
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32).tolist()
+
+    def _delay(self, count: int) -> float:
+        return _seconds(self.latency_ms + self.per_item_ms * count)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._delay(len(texts)))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._delay(len(texts)))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embed_documents([query])[0]
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return (await self.aembed_documents([query]))[0]
+
+    async def aembed_queries(self, queries: List[str]) -> List[List[float]]:
+        return await self.aembed_documents(queries)
+
+    async def aclose(self):
+        pass
+
+    @property
+    def embedder(self):
+        return self
+
+
+class FakeRemoteVectorStore(LocalVectorStore):
+    """
+    The in-process index plus a network round trip per call, standing in for Pinecone.
+    """
+
+    def __init__(self, *args, search_latency_ms: float = 15.0, upsert_latency_ms: float = 25.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.search_latency_ms = search_latency_ms
+        self.upsert_latency_ms = upsert_latency_ms
+
+    def add_embeddings(self, *args, **kwargs):
+        time.sleep(_seconds(self.upsert_latency_ms))
+        return super().add_embeddings(*args, **kwargs)
+
+    def search_by_vectors(self, *args, **kwargs):
+        time.sleep(_seconds(self.search_latency_ms))
+        return super().search_by_vectors(*args, **kwargs)
+
+
+class FakeLLMGenerator:
+    """
+    Drop-in for app.rag.generator.LLMGenerator. The answer quotes the start
+    of the context, arrives after `latency_ms` (time to first token), and
+    streams `tokens` fragments `token_interval_ms` apart.
+    """
+
+    def __init__(self, latency_ms: float = 250.0, tokens: int = 40, token_interval_ms: float = 5.0):
+        self.model_name = "fake-llm"
+        self.latency_ms = latency_ms
+        self.tokens = tokens
+        self.token_interval_ms = token_interval_ms
+
+    def _answer(self, prompt: str) -> List[str]:
+        context = prompt.split("Context:", 1)[-1].split()
+        words = (context or ["ok"]) * (self.tokens // max(1, len(context)) + 1)
+        return [word + " " for word in words[:self.tokens]]
+
+    def _total_delay(self) -> float:
+        return _seconds(self.latency_ms + self.token_interval_ms * self.tokens)
+
+    @staticmethod
+    def is_error(answer: str) -> bool:
+        return answer.startswith(ERROR_PREFIXES)
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self._total_delay())
+        return "".join(self._answer(prompt)).strip()
+
+    async def agenerate(self, prompt: str) -> str:
+        await asyncio.sleep(self._total_delay())
+        return "".join(self._answer(prompt)).strip()
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        await asyncio.sleep(_seconds(self.latency_ms))
+        for token in self._answer(prompt):
+            await asyncio.sleep(_seconds(self.token_interval_ms))
+            yield token
+
+    async def aclose(self):
+        pass
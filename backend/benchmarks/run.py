@@ -0,0 +1,375 @@
+# backend/benchmarks/run.py
+"""
+Offline, per-stage benchmark of the ingestion and chat pipelines.
+
+HF Inference, Pinecone and Groq are replaced by deterministic local fakes
+(benchmarks/fakes.py) with injected latency, so no accounts or network are
+needed. Every stage is timed on its own and under each concurrency level:
+
+    extract, chunking, embedding, upsert, retrieval, prompt, generation, http
+
+Usage (from backend/, after pip install -r benchmarks/requirements.txt):
+
+    python -m benchmarks.run
+    python -m benchmarks.run --concurrency 1,8,32 --iterations 100 --llm-latency-ms 400
+    python -m benchmarks.run --save-baseline           # record benchmarks/baseline.json
+    python -m benchmarks.run --fail-on-regression      # compare, exit 1 on regressions
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF = os.path.join(BACKEND_DIR, "data", "documents", "gdpr.pdf")
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, "benchmarks", "baseline.json")
+
+API_KEY = "benchmark-key"
+
+QUESTIONS = [
+    "What does Article 17 say about the right to erasure?",
+    "When must a personal data breach be notified to the supervisory authority?",
+    "What are the conditions for valid consent?",
+    "Who must designate a data protection officer?",
+    "What information must be provided when data is collected from the data subject?",
+    "What are the principles relating to processing of personal data?",
+    "How can personal data be transferred to a third country?",
+    "What fines can supervisory authorities impose?",
+]
+
+
+# ----------------------------------------------------------------- statistics
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Linear-interpolated percentile of an ascending list (p in 0..100).
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * p / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies: List[float], items: int, wall_seconds: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "ops": len(ordered),
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "ops_per_s": len(ordered) / wall_seconds if wall_seconds else 0.0,
+        "items_per_s": items / wall_seconds if wall_seconds else 0.0,
+    }
+
+
+def run_sync(op: Callable[[int], int], iterations: int, concurrency: int) -> Dict[str, float]:
+    """
+    Run op(0..iterations-1) on `concurrency` threads. op returns the number
+    of items (pages, chunks, ...) it processed.
+    """
+    def timed(i: int) -> Tuple[float, int]:
+        started = time.perf_counter()
+        items = op(i)
+        return time.perf_counter() - started, items
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(iterations)))
+    wall = time.perf_counter() - started
+    return summarize([r[0] for r in results], sum(r[1] for r in results), wall)
+
+
+async def run_async(op: Callable[[int], Awaitable[int]], iterations: int, concurrency: int) -> Dict[str, float]:
+    """
+    Run op(0..iterations-1) with at most `concurrency` calls in flight.
+    """
+    next_index = iter(range(iterations))
+    latencies: List[float] = []
+    items = 0
+
+    async def worker():
+        nonlocal items
+        for i in next_index:
+            started = time.perf_counter()
+            count = await op(i)
+            latencies.append(time.perf_counter() - started)
+            items += count
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, items, time.perf_counter() - started)
+
+
+# ------------------------------------------------------------------- baseline
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Regressions vs. the baseline: p95 latency up, or throughput down,
+    by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get("results", {}).get(key)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: p95 {current['p95_ms']:.1f} ms vs {previous['p95_ms']:.1f} ms baseline"
+            )
+        if previous["ops_per_s"] and current["ops_per_s"] < previous["ops_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {current['ops_per_s']:.1f} ops/s vs {previous['ops_per_s']:.1f} ops/s baseline"
+            )
+    return regressions
+
+
+def print_table(results: Dict, baseline: Optional[Dict]):
+    header = f"{'stage':<12}{'conc':>5}{'ops':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}{'items/s':>10}"
+    if baseline:
+        header += f"{'p95 vs base':>13}"
+    print(header)
+    print("-" * len(header))
+    for key, r in results.items():
+        stage, concurrency = key.split("@")
+        line = (
+            f"{stage:<12}{concurrency:>5}{r['ops']:>6}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+            f"{r['p99_ms']:>10.1f}{r['ops_per_s']:>10.1f}{r['items_per_s']:>10.1f}"
+        )
+        previous = (baseline or {}).get("results", {}).get(key)
+        if previous and previous["p95_ms"]:
+            line += f"{(r['p95_ms'] / previous['p95_ms'] - 1) * 100:>+12.0f}%"
+        print(line)
+
+
+# --------------------------------------------------------------------- stages
+
+def _configure_environment(index_dir: str):
+    # Must run before any app module is imported: several read settings at import time
+    os.environ.update({
+        "API_KEY": API_KEY,
+        "VECTOR_STORE_BACKEND": "local",
+        "LOCAL_INDEX_DIR": index_dir,
+        "CHUNK_REGISTRY_PATH": "",
+        "CHUNK_STORE_PATH": "",
+        "METADATA_DB_PATH": "",
+        "BM25_INDEX_PATH": "",
+        "QUERY_EMBEDDING_CACHE_PATH": "",
+        "ANSWER_CACHE_ENABLED": "false",
+        "RATE_LIMIT": str(10 ** 9),
+        "RATE_LIMIT_BACKEND": "memory",
+    })
+
+
+def _question(i: int) -> str:
+    # Distinct text per call, so the query embedding cache never answers
+    return f"{QUESTIONS[i % len(QUESTIONS)]} (request {i})"
+
+
+def run_benchmarks(args) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    from app.core.config import settings
+    from app.models.document import DocumentMetadata
+    from app.rag import embeddings, vectorstore
+    from app.rag.extract import iter_pdf_pages
+    from app.rag.ingest import _embed_batch, _upsert_batch, chunk_page, new_splitter
+    from app.rag.prompt import build_prompt
+    from app.rag.rerank import rerank_context
+    from app.rag.retriever import PolicyRetriever
+    from app.rag.scope import DocumentFilter
+    from app.services.metadata_store import metadata_store
+    from benchmarks.fakes import FakeEmbeddingModel, FakeLLMGenerator, FakeRemoteVectorStore
+
+    embedding_model = FakeEmbeddingModel(latency_ms=args.embed_latency_ms, per_item_ms=args.embed_per_item_ms)
+    embeddings._embedding_model = embedding_model
+    store = FakeRemoteVectorStore(
+        embedding=embedding_model,
+        index_dir=settings.LOCAL_INDEX_DIR,
+        search_latency_ms=args.search_latency_ms,
+        upsert_latency_ms=args.upsert_latency_ms
+    )
+    vectorstore._local_store = store
+    llm = FakeLLMGenerator(latency_ms=args.llm_latency_ms, tokens=args.llm_tokens)
+
+    from app.main import app
+    from app.api.chat import rag_service
+    rag_service.generator = llm
+
+    filename = os.path.basename(args.pdf)
+    results: Dict[str, Dict[str, float]] = {}
+
+    def record(stage: str, concurrency: int, summary: Dict[str, float]):
+        results[f"{stage}@{concurrency}"] = summary
+        print(f"  {stage:<12} c={concurrency:<3} p50 {summary['p50_ms']:.1f} ms", file=sys.stderr)
+
+    # 1. PDF extraction (whole document per op; parallel inside iter_pdf_pages)
+    pages: List[Tuple[int, str]] = []
+
+    def extract(_: int) -> int:
+        nonlocal pages
+        pages = list(iter_pdf_pages(args.pdf))
+        return len(pages)
+
+    record("extract", 1, run_sync(extract, args.document_iterations, 1))
+
+    # 2. Chunking (whole document per op)
+    chunks = []
+
+    def chunk(_: int) -> int:
+        nonlocal chunks
+        splitter = new_splitter()
+        chunks = [c for number, text in pages for c in chunk_page(splitter, filename, number, text)]
+        return len(chunks)
+
+    record("chunking", 1, run_sync(chunk, args.document_iterations, 1))
+
+    doc_id = "doc_benchmark"
+    for i, c in enumerate(chunks):
+        c.metadata["doc_id"] = doc_id
+        c.metadata["chunk_id"] = f"{doc_id}_{i}"
+    batch_size = max(1, settings.EMBED_BATCH_SIZE)
+    batches = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    vectors = [[embedding_model._vector(c.page_content) for c in batch] for batch in batches]
+
+    # Index the whole document once, so retrieval has something to search
+    for batch, batch_vectors in zip(batches, vectors):
+        _upsert_batch(store, batch, batch_vectors)
+
+    metadata_store.save_document(DocumentMetadata(id=doc_id, filename=filename, status="available"))
+    search_filter = DocumentFilter([doc_id])
+    retriever = PolicyRetriever(k=settings.RETRIEVAL_FETCH_K)
+
+    question_vectors = [embedding_model._vector(_question(i)) for i in range(args.iterations)]
+    retrieved = [
+        retriever.retrieve_by_vector(question_vectors[i], filter=search_filter, query=_question(i))
+        for i in range(min(args.iterations, len(QUESTIONS)))
+    ]
+    prompts = [
+        build_prompt(_question(i), rerank_context(docs, k=settings.RETRIEVAL_K))[0]
+        for i, docs in enumerate(retrieved)
+    ]
+
+    def embed(i: int) -> int:
+        return len(_embed_batch(embedding_model, batches[i % len(batches)]))
+
+    def upsert(i: int) -> int:
+        n = i % len(batches)
+        _upsert_batch(store, batches[n], vectors[n])
+        return len(batches[n])
+
+    def retrieve(i: int) -> int:
+        return len(retriever.retrieve_by_vector(question_vectors[i], filter=search_filter, query=_question(i)))
+
+    def prompt(i: int) -> int:
+        docs = rerank_context(retrieved[i % len(retrieved)], k=settings.RETRIEVAL_K)
+        return len(build_prompt(_question(i), docs)[1])
+
+    async def generate(i: int) -> int:
+        await llm.agenerate(prompts[i % len(prompts)])
+        return 1
+
+    async def run_http(concurrency: int) -> Dict[str, float]:
+        headers = {"X-API-Key": API_KEY}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+            response = await client.post(
+                "/api/v1/workspaces/", json={"name": "benchmark", "document_ids": [doc_id]}, headers=headers
+            )
+            response.raise_for_status()
+            workspace_id = response.json()["id"]
+
+            async def chat(i: int) -> int:
+                response = await client.post(
+                    "/api/v1/chat",
+                    json={"question": _question(i), "workspace_id": workspace_id},
+                    headers=headers
+                )
+                response.raise_for_status()
+                return 1
+
+            return await run_async(chat, args.iterations, concurrency)
+
+    for concurrency in args.concurrency:
+        record("embedding", concurrency, run_sync(embed, args.iterations, concurrency))
+        record("upsert", concurrency, run_sync(upsert, args.iterations, concurrency))
+        record("retrieval", concurrency, run_sync(retrieve, args.iterations, concurrency))
+        record("prompt", concurrency, run_sync(prompt, args.iterations, concurrency))
+        record("generation", concurrency, asyncio.run(run_async(generate, args.iterations, concurrency)))
+        record("http", concurrency, asyncio.run(run_http(concurrency)))
+
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline per-stage benchmark with local service fakes.")
+    parser.add_argument("--pdf", default=DEFAULT_PDF, help="PDF to extract, chunk and index")
+    parser.add_argument("--concurrency", default="1,8",
+                        type=lambda s: [int(c) for c in s.split(",")],
+                        help="comma-separated concurrency levels (default: 1,8)")
+    parser.add_argument("--iterations", type=int, default=50, help="operations per stage and concurrency")
+    parser.add_argument("--document-iterations", type=int, default=3,
+                        help="whole-document runs for extract and chunking")
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0)
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.5)
+    parser.add_argument("--search-latency-ms", type=float, default=15.0)
+    parser.add_argument("--upsert-latency-ms", type=float, default=25.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=250.0)
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 / throughput change before flagging a regression (default: 0.2)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is flagged")
+    parser.add_argument("--json", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as index_dir:
+        _configure_environment(index_dir)
+        results = run_benchmarks(args)
+
+    config = {k: v for k, v in vars(args).items() if k.endswith("_ms") or k in ("llm_tokens", "iterations")}
+    report = {"config": config, "results": results}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print("⚠️ Baseline was recorded with different latency settings; comparison is approximate.")
+
+    print_table(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+        if not regressions:
+            print("✅ No regressions against baseline.")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# backend/benchmarks/scoping.py
+"""
+Workspace scoping benchmark: retrieval latency for workspaces of 10, 100,
+1k and 10k documents, in one index of --corpus-docs documents.
+
+Each workspace is a random subset of the corpus, so its rows are scattered
+through the index. Measured per workspace size:
+
+    vector      local index search with the workspace DocumentFilter (selection
+                cached under its key) and with a plain {"doc_id": {"$in": [...]}}
+                filter (resolved on every query); "all" is an unfiltered search
+                of the whole index, the floor for exact search
+    keyword     BM25 search with the same two filters
+    pinecone    requests per query and filter bytes per request (computed,
+                not sent) with PINECONE_FILTER_MAX_IDS
+
+Usage (from backend/):
+
+    python -m benchmarks.scoping
+    python -m benchmarks.scoping --sizes 10,100,1000,10000 --corpus-docs 10000 --chunks-per-doc 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.run import _configure_environment, percentile
+
+WORDS = [f"term{i}" for i in range(2000)] + ["article", "erasure", "controller", "processor", "consent"]
+
+
+def _p50_ms(op: Callable[[int], object], iterations: int) -> float:
+    op(0)  # warm-up: first query resolves (and caches) the selection
+    latencies = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        op(i)
+        latencies.append(time.perf_counter() - started)
+    return percentile(sorted(latencies), 50) * 1000
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    from langchain_core.documents import Document
+
+    from app.core.config import settings
+    from app.rag.bm25 import BM25Index
+    from app.rag.scope import DocumentFilter
+    from app.rag.vectorstore import LocalVectorStore
+
+    rng = np.random.default_rng(0)
+    doc_ids = [f"doc_{i:06d}" for i in range(args.corpus_docs)]
+
+    print(f"Indexing {args.corpus_docs * args.chunks_per_doc} chunks...", file=sys.stderr)
+    store = LocalVectorStore(embedding=None, index_dir=settings.LOCAL_INDEX_DIR)
+    keyword = BM25Index(":memory:")
+    words = random.Random(0)
+    for start in range(0, len(doc_ids), 1000):
+        chunks = [
+            Document(
+                page_content=" ".join(words.choices(WORDS, k=40)),
+                metadata={"doc_id": doc_id, "doc_name": f"{doc_id}.pdf", "chunk_id": f"{doc_id}_{n}"}
+            )
+            for doc_id in doc_ids[start:start + 1000]
+            for n in range(args.chunks_per_doc)
+        ]
+        vectors = rng.standard_normal((len(chunks), args.dim), dtype=np.float32)
+        store.add_embeddings(
+            None, vectors, [c.metadata for c in chunks], [c.metadata["chunk_id"] for c in chunks]
+        )
+        keyword.add(chunks)
+
+    queries = rng.standard_normal((args.iterations, args.dim), dtype=np.float32)
+    sampler = random.Random(1)
+    results: Dict[str, Dict[str, float]] = {}
+
+    unfiltered = _p50_ms(lambda i: store.search_by_vectors(queries[i % len(queries)], k=10), args.iterations)
+
+    for size in args.sizes:
+        members = sampler.sample(doc_ids, min(size, len(doc_ids)))
+        plain = {"doc_id": {"$in": list(members)}}
+        scope = DocumentFilter(members)
+
+        def vector(filter) -> Callable[[int], object]:
+            return lambda i: store.search_by_vectors(queries[i % len(queries)], k=10, filter=filter)
+
+        def bm25(filter) -> Callable[[int], object]:
+            return lambda i: keyword.search(f"article erasure {WORDS[i % 2000]}", k=10, filter=filter)
+
+        parts = scope.chunks(settings.PINECONE_FILTER_MAX_IDS)
+        results[str(size)] = {
+            "vector_all_ms": unfiltered,
+            "vector_plain_ms": _p50_ms(vector(plain), args.iterations),
+            "vector_scope_ms": _p50_ms(vector(scope), args.iterations),
+            "keyword_plain_ms": _p50_ms(bm25(plain), args.iterations),
+            "keyword_scope_ms": _p50_ms(bm25(scope), args.iterations),
+            "pinecone_requests": len(parts),
+            "pinecone_filter_bytes": max(len(json.dumps(part)) for part in parts),
+        }
+    return results
+
+
+def print_table(results: Dict[str, Dict[str, float]]):
+    print(f"{'docs':>6} {'vector ms':>10} {'(plain)':>9} {'(all)':>7} {'keyword ms':>11} {'(plain)':>9} "
+          f"{'pinecone req':>13} {'filter KB':>10}")
+    for size, r in results.items():
+        print(f"{size:>6} {r['vector_scope_ms']:>10.2f} {r['vector_plain_ms']:>9.2f} {r['vector_all_ms']:>7.2f} "
+              f"{r['keyword_scope_ms']:>11.2f} {r['keyword_plain_ms']:>9.2f} "
+              f"{r['pinecone_requests']:>13} {r['pinecone_filter_bytes'] / 1024:>10.1f}")
+
+
+def parse_sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Retrieval latency by workspace size.")
+    parser.add_argument("--sizes", type=parse_sizes, default=[10, 100, 1000, 10000],
+                        help="comma-separated workspace sizes (documents)")
+    parser.add_argument("--corpus-docs", type=int, default=10000, help="documents in the index")
+    parser.add_argument("--chunks-per-doc", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384, help="embedding dimension")
+    parser.add_argument("--iterations", type=int, default=50, help="queries per measurement")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rag-benchmark-") as index_dir:
+        _configure_environment(index_dir)
+        results = run(args)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+# backend/tests/test_bm25.py
+
+import sqlite3
+
+import pytest
+
+from app.rag import bm25, chunk_store
+
+LEGACY_SCHEMA = """
+CREATE TABLE chunks (
+    id INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    doc_name TEXT NOT NULL,
+    doc_id TEXT,
+    length INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE INDEX chunks_doc_name ON chunks (doc_name);
+CREATE TABLE postings (
+    term TEXT NOT NULL,
+    chunk INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chunk)
+) WITHOUT ROWID;
+INSERT INTO chunks VALUES (7, 'd1_c0', 'gdpr.pdf', 'd1', 3, 'right to erasure',
+    '{"chunk_id": "d1_c0", "doc_name": "gdpr.pdf", "doc_id": "d1"}');
+INSERT INTO postings VALUES ('right', 7, 1), ('to', 7, 1), ('erasure', 7, 1);
+"""
+
+
+@pytest.mark.parametrize("sqlite_version", [sqlite3.sqlite_version_info, (3, 34, 1)])
+def test_legacy_text_column_moves_to_the_chunk_store(tmp_path, monkeypatch, sqlite_version):
+    path = str(tmp_path / "bm25.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    monkeypatch.setattr(chunk_store, "_chunk_store", chunk_store.ChunkStore(":memory:"))
+    monkeypatch.setattr(bm25.sqlite3, "sqlite_version_info", sqlite_version)
+
+    index = bm25.BM25Index(path)
+
+    conn = sqlite3.connect(path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(chunks)")}
+    assert "text" not in columns
+    assert {"chunks_doc_name", "chunks_doc_id"} <= indexes
+    assert conn.execute("SELECT doc_count, total_length FROM corpus").fetchone() == (1, 3)
+    assert chunk_store.get_chunk_store().get_many(["d1_c0"]) == {"d1_c0": "right to erasure"}
+    assert [doc.id for doc in index.search("erasure", filter={"doc_id": {"$in": ["d1"]}})] == ["d1_c0"]
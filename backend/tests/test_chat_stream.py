@@ -0,0 +1,117 @@
+# backend/tests/test_chat_stream.py
+
+import asyncio
+
+from langchain_core.documents import Document
+
+from app.rag.generator import LLMError
+from app.rag.scope import DocumentFilter
+from app.services import rag_service as rag_module
+from app.services.rag_service import RAGService
+from app.services.session_store import session_store
+
+WORKSPACE_ID = "ws_test"
+PARTIAL_ANSWER = "The data subject may request erasure "
+
+
+class FakeEmbeddings:
+    async def aembed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+async def failing_stream(prompt):
+    yield PARTIAL_ANSWER
+    raise LLMError("Error contacting LLM Provider: connection reset")
+
+
+def collect(events):
+    """
+    (event, data) pairs of a stream, ending with ("raised", message) if it raised.
+    """
+    async def run():
+        collected = []
+        try:
+            async for event, data in events:
+                collected.append((event, data))
+        except LLMError as e:
+            collected.append(("raised", str(e)))
+        return collected
+    return asyncio.run(run())
+
+
+def make_service(monkeypatch, retrieved):
+    service = RAGService()
+
+    async def aretrieve(question, scope, embedding, session=None):
+        return retrieved
+
+    monkeypatch.setattr(rag_module, "get_embedding_model", lambda: FakeEmbeddings())
+    monkeypatch.setattr(service, "_aretrieve", aretrieve)
+    monkeypatch.setattr(service, "_rerank", lambda docs: docs)
+    monkeypatch.setattr(service, "_build_prompt", lambda question, docs, history=None: ("prompt", docs))
+    return service
+
+
+def test_llm_failure_after_partial_tokens_is_not_cached_or_recorded(monkeypatch):
+    docs = [Document(
+        page_content="The data subject shall have the right to obtain erasure.",
+        metadata={"doc_id": "d1", "doc_name": "gdpr.pdf", "page_number": 1, "chunk_id": "d1_c0"}
+    )]
+    service = make_service(monkeypatch, docs)
+    monkeypatch.setattr(service.generator, "astream", failing_stream)
+    monkeypatch.setattr(rag_module.settings, "ANSWER_CACHE_ENABLED", True)
+    stored = []
+    monkeypatch.setattr(rag_module.answer_cache, "store", lambda *args: stored.append(args))
+
+    session = session_store.open(None, WORKSPACE_ID)
+    events = collect(service._astream(
+        "Can I request erasure?", WORKSPACE_ID, DocumentFilter(["d1"]), None, session
+    ))
+
+    names = [event for event, _ in events]
+    assert "done" not in names
+    assert events[-1] == ("raised", "Error contacting LLM Provider: connection reset")
+    assert stored == []
+    assert session.history() == []
+
+
+def test_no_retrieved_documents_is_reported_as_refused(monkeypatch):
+    service = make_service(monkeypatch, [])
+
+    events = collect(service._astream("Can I request erasure?", WORKSPACE_ID, DocumentFilter(["d1"]), None))
+
+    event, data = events[-1]
+    assert event == "done"
+    assert data["refused"] is True
+    assert data["answer"].startswith(rag_module.REFUSAL_RESPONSE)
+
+
+def test_llm_failure_is_streamed_as_error_event(monkeypatch):
+    import httpx
+
+    from app.api import chat
+    from app.main import app
+
+    def stream(question, workspace_id, session_id=None):
+        async def events():
+            yield "citations", {"citations": []}
+            async for text in failing_stream("prompt"):
+                yield "token", {"text": text}
+            yield "done", {"answer": PARTIAL_ANSWER, "refused": False}
+        return events()
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/chat/stream",
+                json={"question": "Can I request erasure?", "workspace_id": WORKSPACE_ID},
+                headers={"x-api-key": rag_module.settings.API_KEY}
+            )
+
+    monkeypatch.setattr(chat.rag_service, "stream", stream)
+    response = asyncio.run(post())
+
+    assert "event: done" not in response.text
+    assert response.text.rstrip().splitlines()[-2] == "event: error"
+    assert "connection reset" in response.text
@@ -0,0 +1,38 @@
+# backend/tests/test_embedding_cache.py
+
+import asyncio
+import threading
+
+from app.rag.embedding_cache import QueryEmbeddingCache
+
+MODEL = "test-model"
+
+
+def test_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cache = QueryEmbeddingCache(max_size=8, ttl_seconds=0, disk_path=str(tmp_path / "cache.sqlite3"))
+    disk_threads = []
+    for name in ("get", "set_many"):
+        original = getattr(cache._disk, name)
+
+        def traced(*args, _original=original):
+            disk_threads.append(threading.get_ident())
+            return _original(*args)
+
+        monkeypatch.setattr(cache._disk, name, traced)
+
+    async def run():
+        await cache.aset_many(MODEL, {"What is the retention period?": [0.5, 0.25]})
+        # A new process: memory is empty, the disk tier still has the vector
+        cache._memory.clear()
+        vectors = await cache.aget_many(MODEL, ["what is the retention period", "unknown"])
+        # Promoted to memory: no disk read this time
+        again = await cache.aget(MODEL, "What is the retention period?")
+        return threading.get_ident(), vectors, again
+
+    loop_thread, vectors, again = asyncio.run(run())
+
+    assert vectors == [[0.5, 0.25], None]
+    assert again == [0.5, 0.25]
+    assert len(disk_threads) == 3  # one write, two reads (hit and miss)
+    assert loop_thread not in disk_threads
+    assert cache.stats()["disk_hits"] == 1
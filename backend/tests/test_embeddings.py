@@ -0,0 +1,43 @@
+# backend/tests/test_embeddings.py
+
+import asyncio
+
+import pytest
+
+from app.rag import embeddings
+
+
+class FailingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def feature_extraction(self, texts, model=None):
+        self.calls += 1
+        raise RuntimeError("connection reset")
+
+
+class AsyncFailingClient(FailingClient):
+    async def feature_extraction(self, texts, model=None):
+        return FailingClient.feature_extraction(self, texts, model)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(embeddings.settings, "EMBED_MAX_RETRIES", 3)
+    monkeypatch.setattr(embeddings.settings, "EMBED_RETRY_BACKOFF_SECONDS", 0.0)
+    model = embeddings.EmbeddingModel()
+    model.client = FailingClient()
+    model._async_client = AsyncFailingClient()
+    return model
+
+
+def test_embedding_is_retried_embed_max_retries_times(model):
+    with pytest.raises(ValueError):
+        model.embed_documents(["text"])
+    assert model.client.calls == 4
+
+
+def test_async_embedding_is_retried_embed_max_retries_times(model):
+    with pytest.raises(ValueError):
+        asyncio.run(model.aembed_documents(["text"]))
+    assert model._async_client.calls == 4
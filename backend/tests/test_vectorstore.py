@@ -0,0 +1,42 @@
+# backend/tests/test_vectorstore.py
+
+import pytest
+
+from app.rag.vectorstore import LocalVectorStore
+
+
+class UnusedEmbeddings:
+    def embed_query(self, text):
+        raise AssertionError("queries are embedded by the caller")
+
+    def embed_documents(self, texts):
+        raise AssertionError("documents are embedded by the caller")
+
+
+def test_crash_before_tombstones_keeps_one_row_per_id(tmp_path, monkeypatch):
+    store = LocalVectorStore(UnusedEmbeddings(), str(tmp_path))
+    store.add_embeddings(None, [[1.0, 0.0], [0.0, 1.0]], [{"v": 1}, {"v": 1}], ["a", "b"])
+
+    # Re-adding "a" commits the manifest, then the process dies before the
+    # old row's tombstone is written
+    def crash(rows):
+        raise SystemExit("killed")
+
+    monkeypatch.setattr(store, "_tombstone", crash)
+    with pytest.raises(SystemExit):
+        store.add_embeddings(None, [[1.0, 0.0]], [{"v": 2}], ["a"])
+    monkeypatch.undo()
+
+    reloaded = LocalVectorStore(UnusedEmbeddings(), str(tmp_path))
+    hits = reloaded.similarity_search_by_vector_with_score([1.0, 0.0], k=10)
+    assert sorted(doc.id for doc, _ in hits) == ["a", "b"]
+    assert [doc.metadata["v"] for doc, _ in hits if doc.id == "a"] == [2]
+
+
+def test_duplicate_ids_in_one_batch_keep_the_last_row(tmp_path):
+    store = LocalVectorStore(UnusedEmbeddings(), str(tmp_path))
+    store.add_embeddings(None, [[1.0, 0.0], [0.9, 0.1]], [{"v": 1}, {"v": 2}], ["a", "a"])
+
+    for current in (store, LocalVectorStore(UnusedEmbeddings(), str(tmp_path))):
+        hits = current.similarity_search_by_vector_with_score([1.0, 0.0], k=10)
+        assert [(doc.id, doc.metadata["v"]) for doc, _ in hits] == [("a", 2)]
@@ -71,7 +71,25 @@ function App() {
     setNotification("Uploading document...");
     try {
       const newDoc = await documentService.uploadDocument(file, apiKey);
-      setDocuments(prev => [...prev, newDoc]);
+      // An identical re-upload returns the document that is already listed
+      setDocuments(prev => prev.some(d => d.id === newDoc.id) ? prev : [...prev, newDoc]);
+
+      // Ingestion runs in the background: poll the job until it settles
+      let job = newDoc.job_id ? await documentService.getJob(newDoc.job_id, apiKey) : undefined;
+      while (job && (job.status === 'queued' || job.status === 'processing')) {
+        setNotification(`Indexing ${file.name}: ${job.pages_extracted} pages, ${job.chunks_upserted} chunks indexed...`);
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        job = await documentService.getJob(job.id, apiKey);
+      }
+
+      const finalDoc = await documentService.getDocument(newDoc.id, apiKey);
+      setDocuments(prev => prev.map(d => d.id === finalDoc.id ? finalDoc : d));
+
+      if (finalDoc.status === 'error') {
+        setNotification(null);
+        setAppError(job?.error ? `Ingestion failed: ${job.error}` : "Ingestion failed.");
+        return;
+      }
       setNotification("Upload complete.");
       setTimeout(() => setNotification(null), 3000);
     } catch (err: any) {
@@ -1,5 +1,5 @@
 import { API_BASE_URL, getHeaders } from './client';
-import type { DocumentMetadata, Workspace, CreateWorkspaceRequest } from '../types/api';
+import type { DocumentMetadata, IngestionJob, Workspace, CreateWorkspaceRequest } from '../types/api';
 
 export const documentService = {
     async listDocuments(apiKey: string): Promise<DocumentMetadata[]> {
@@ -34,6 +34,22 @@ export const documentService = {
             throw new Error(errorMsg);
         }
         return response.json();
+    },
+
+    async getDocument(documentId: string, apiKey: string): Promise<DocumentMetadata> {
+        const response = await fetch(`${API_BASE_URL}/documents/${documentId}`, {
+            headers: getHeaders(apiKey)
+        });
+        if (!response.ok) throw new Error('Failed to fetch document');
+        return response.json();
+    },
+
+    async getJob(jobId: string, apiKey: string): Promise<IngestionJob> {
+        const response = await fetch(`${API_BASE_URL}/documents/jobs/${jobId}`, {
+            headers: getHeaders(apiKey)
+        });
+        if (!response.ok) throw new Error('Failed to fetch ingestion job');
+        return response.json();
     }
 };
 
@@ -19,6 +19,23 @@ export interface DocumentMetadata {
   status: 'processing' | 'available' | 'error';
   page_count: number;
   upload_timestamp: string;
+  job_id?: string;
+}
+
+export interface IngestionJob {
+  id: string;
+  document_id: string;
+  filename: string;
+  status: 'queued' | 'processing' | 'available' | 'error';
+  pages_extracted: number;
+  chunks_embedded: number;
+  chunks_upserted: number;
+  chunks_skipped: number;
+  chunks_reused: number;
+  error?: string;
+  created_at: string;
+  started_at?: string;
+  finished_at?: string;
 }
 
 export interface Workspace {